@@ -20,7 +20,7 @@ import json
 # OPORTUNIDAD (Datos básicos del contrato)
 # ═══════════════════════════════════════════════════════════════════════════════
 
-@dataclass
+@dataclass(slots=True)
 class DuracionContrato:
     """Duración y prórrogas del contrato"""
     meses: int = 0
@@ -28,7 +28,7 @@ class DuracionContrato:
     meses_prorroga: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
 class Oportunidad:
     """Datos básicos de la oportunidad/contrato"""
     id_expediente: str = ""
@@ -44,7 +44,7 @@ class Oportunidad:
 # ADJUDICATARIO (Nuestro cliente potencial)
 # ═══════════════════════════════════════════════════════════════════════════════
 
-@dataclass
+@dataclass(slots=True)
 class CapacidadInterna:
     """Evaluación de capacidad interna del adjudicatario"""
     cableado: str = "desconocido"  # si|no|probable|improbable|desconocido
@@ -54,7 +54,7 @@ class CapacidadInterna:
     helpdesk: str = "desconocido"
 
 
-@dataclass
+@dataclass(slots=True)
 class Adjudicatario:
     """Información del adjudicatario (empresa que ganó el contrato)"""
     nombre: str = ""
@@ -72,7 +72,7 @@ class Adjudicatario:
 # CLIENTE FINAL (Organismo contratante)
 # ═══════════════════════════════════════════════════════════════════════════════
 
-@dataclass
+@dataclass(slots=True)
 class ClienteFinal:
     """Información del organismo que contrata (cliente final del adjudicatario)"""
     nombre: str = ""
@@ -88,7 +88,7 @@ class ClienteFinal:
 # ECONÓMICO
 # ═══════════════════════════════════════════════════════════════════════════════
 
-@dataclass
+@dataclass(slots=True)
 class ValorEstimadoSubcontratacion:
     """Estimación del valor de subcontratación para SRS"""
     minimo: float = 0.0
@@ -96,7 +96,7 @@ class ValorEstimadoSubcontratacion:
     justificacion: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class Economico:
     """Datos económicos del contrato"""
     importe_adjudicacion: float = 0.0
@@ -110,7 +110,7 @@ class Economico:
 # COMPONENTES IT
 # ═══════════════════════════════════════════════════════════════════════════════
 
-@dataclass
+@dataclass(slots=True)
 class UbicacionComponente:
     """Ubicación geográfica de un componente IT"""
     localidad: Optional[str] = None
@@ -119,7 +119,7 @@ class UbicacionComponente:
     zona_srs: str = ""  # base|cercana|expansion
 
 
-@dataclass
+@dataclass(slots=True)
 class CoberturaGeografica:
     """Cobertura geográfica requerida para un componente"""
     ambito: str = ""  # local|provincial|autonomico|nacional|multisede
@@ -128,7 +128,7 @@ class CoberturaGeografica:
     requiere_desplazamiento: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class ComponenteIT:
     """Componente IT detectado en el pliego"""
     tipo: str = ""  # infraestructura|software|servicios|comunicaciones|seguridad
@@ -153,7 +153,7 @@ class ComponenteIT:
 # DOLORES (Pain points del adjudicatario)
 # ═══════════════════════════════════════════════════════════════════════════════
 
-@dataclass
+@dataclass(slots=True)
 class ImpactoNegocio:
     """Impacto del dolor en el negocio"""
     descripcion: str = ""
@@ -162,7 +162,7 @@ class ImpactoNegocio:
     estimacion: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class UrgenciaTemporal:
     """Urgencia temporal del dolor"""
     fecha_limite: Optional[str] = None  # YYYY-MM-DD
@@ -170,7 +170,7 @@ class UrgenciaTemporal:
     margen_maniobra: str = "moderado"  # escaso|moderado|amplio
 
 
-@dataclass
+@dataclass(slots=True)
 class SRSSolucion:
     """Solución que SRS puede ofrecer para el dolor"""
     servicio_principal: str = ""  # del catálogo
@@ -178,7 +178,7 @@ class SRSSolucion:
     argumento_venta: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class Dolor:
     """Dolor/problema detectado que SRS puede resolver"""
     categoria: str = ""  # temporal|tecnico|cumplimiento|recursos|economico|operativo|estrategico
@@ -198,7 +198,7 @@ class Dolor:
 # REQUISITOS DE SOLVENCIA
 # ═══════════════════════════════════════════════════════════════════════════════
 
-@dataclass
+@dataclass(slots=True)
 class SolvenciaEconomica:
     """Requisitos de solvencia económica"""
     facturacion_minima: Optional[float] = None
@@ -208,7 +208,7 @@ class SolvenciaEconomica:
     otros: List[str] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class SolvenciaTecnica:
     """Requisitos de solvencia técnica"""
     proyectos_similares: Optional[int] = None
@@ -219,7 +219,7 @@ class SolvenciaTecnica:
     otros: List[str] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class SRSCumple:
     """Evaluación de si SRS cumple los requisitos"""
     economica: bool = True
@@ -227,7 +227,7 @@ class SRSCumple:
     notas: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class RequisitosSolvencia:
     """Requisitos de solvencia del contrato"""
     economica: Optional[SolvenciaEconomica] = None
@@ -239,7 +239,7 @@ class RequisitosSolvencia:
 # CONTACTOS EXTRAÍDOS
 # ═══════════════════════════════════════════════════════════════════════════════
 
-@dataclass
+@dataclass(slots=True)
 class ContactoExtraido:
     """Contacto extraído del pliego"""
     tipo_entidad: str = ""  # adjudicatario|cliente_final|ute_miembro
@@ -257,7 +257,7 @@ class ContactoExtraido:
 # ALERTAS Y RED FLAGS
 # ═══════════════════════════════════════════════════════════════════════════════
 
-@dataclass
+@dataclass(slots=True)
 class Alerta:
     """Alerta importante para el comercial"""
     tipo: str = ""  # temporal|economico|logistico|tecnico|legal
@@ -266,7 +266,7 @@ class Alerta:
     fecha_relevante: Optional[str] = None  # YYYY-MM-DD
 
 
-@dataclass
+@dataclass(slots=True)
 class RedFlag:
     """Señal de alerta que puede afectar la oportunidad"""
     tipo: str = ""  # presupuesto_bajo|plazo_irreal|requisitos_excesivos|competencia_fuerte|otro
@@ -278,7 +278,7 @@ class RedFlag:
 # COMPETENCIA
 # ═══════════════════════════════════════════════════════════════════════════════
 
-@dataclass
+@dataclass(slots=True)
 class Competencia:
     """Análisis de competencia"""
     incumbente_anterior: Optional[str] = None
@@ -291,7 +291,7 @@ class Competencia:
 # RESUMEN OPERADOR (Lo más importante para el comercial)
 # ═══════════════════════════════════════════════════════════════════════════════
 
-@dataclass
+@dataclass(slots=True)
 class ScoreDesglose:
     """Desglose del score de la oportunidad"""
     alineacion_servicios_srs: int = 0  # 0-25
@@ -302,7 +302,7 @@ class ScoreDesglose:
     probabilidad_subcontratacion: int = 0  # 0-10
 
 
-@dataclass
+@dataclass(slots=True)
 class En30Segundos:
     """Lo que el comercial necesita saber en 30 segundos"""
     que_es: str = ""  # máx 100 chars
@@ -310,7 +310,7 @@ class En30Segundos:
     por_que_ahora: str = ""  # máx 100 chars
 
 
-@dataclass
+@dataclass(slots=True)
 class ServicioSRSAplicable:
     """Servicio SRS que aplica a la oportunidad"""
     servicio: str = ""
@@ -318,7 +318,7 @@ class ServicioSRSAplicable:
     valor_estimado: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class GanchoInicial:
     """Mensajes de apertura para contactar al adjudicatario"""
     whatsapp: str = ""  # mensaje corto, directo
@@ -326,14 +326,14 @@ class GanchoInicial:
     llamada: str = ""  # pitch 30 segundos
 
 
-@dataclass
+@dataclass(slots=True)
 class ObjecionRespuesta:
     """Objeción probable y cómo responderla"""
     objecion: str = ""
     respuesta: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class ResumenOperador:
     """Resumen ejecutivo para el operador comercial"""
     nivel_oportunidad: str = "bronce"  # oro|plata|bronce|descartar
@@ -365,7 +365,7 @@ class ResumenOperador:
 # METADATA DEL ANÁLISIS
 # ═══════════════════════════════════════════════════════════════════════════════
 
-@dataclass
+@dataclass(slots=True)
 class MetadataAnalisisIA:
     """Metadata del análisis realizado por la IA"""
     confianza_global: float = 0.8
@@ -381,7 +381,7 @@ class MetadataAnalisisIA:
 # METADATA COMPLETA DE TRAZABILIDAD
 # ═══════════════════════════════════════════════════════════════════════════════
 
-@dataclass
+@dataclass(slots=True)
 class DocumentoProcesado:
     """Documento procesado en el análisis"""
     tipo: str = ""  # pliego_tecnico, pliego_administrativo, anexo_tecnico
@@ -392,7 +392,7 @@ class DocumentoProcesado:
     palabras_totales: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
 class ProcesamientoIA:
     """Metadata del procesamiento con IA"""
     proveedor: str = ""  # anthropic, openai, gemini
@@ -405,7 +405,7 @@ class ProcesamientoIA:
     tiempo_ms: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
 class AuditoriaComercial:
     """Auditoría de acciones comerciales sobre la oportunidad"""
     estado_comercial: str = "pendiente_revision"  # pendiente_revision|en_contacto|propuesta_enviada|ganado|perdido|descartado
@@ -415,7 +415,7 @@ class AuditoriaComercial:
     notas_operador: List[str] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class MetadataCompleta:
     """Metadata completa de trazabilidad del análisis"""
     id_analisis: str = ""
@@ -433,7 +433,7 @@ class MetadataCompleta:
 # ANÁLISIS COMPLETO (Estructura raíz)
 # ═══════════════════════════════════════════════════════════════════════════════
 
-@dataclass
+@dataclass(slots=True)
 class AnalisisComercial:
     """
     Estructura completa del análisis de una oportunidad.
@@ -9,10 +9,15 @@ NO TIENE RESTRICCIONES DE TIEMPO - La calidad del análisis es prioritaria
 
 import os
 import re
-import json
 import asyncio
+import multiprocessing
 import tempfile
 import hashlib
+from contextlib import asynccontextmanager
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from importlib.util import find_spec
 from typing import Optional, Dict, List, Tuple
 from dataclasses import dataclass, field, asdict
 from datetime import datetime
@@ -20,37 +25,121 @@ from io import BytesIO
 import logging
 
 import httpx
-import pdfplumber
+import orjson
 from bs4 import BeautifulSoup
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Detectar proveedores IA
-ANTHROPIC_AVAILABLE = False
-try:
-    import anthropic
-    ANTHROPIC_AVAILABLE = True
-except ImportError:
+
+def _modulo_disponible(nombre: str) -> bool:
+    """Comprueba si un paquete está instalado sin llegar a importarlo"""
+    try:
+        return find_spec(nombre) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+# Detectar proveedores IA (los SDKs se importan en el primer uso, no al arrancar el worker)
+ANTHROPIC_AVAILABLE = _modulo_disponible("anthropic")
+if not ANTHROPIC_AVAILABLE:
     logger.warning("anthropic no disponible")
 
-OPENAI_AVAILABLE = False
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    pass
+OPENAI_AVAILABLE = _modulo_disponible("openai")
 
-GEMINI_AVAILABLE = False
-try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
-except ImportError:
+GEMINI_AVAILABLE = _modulo_disponible("google.generativeai")
+if not GEMINI_AVAILABLE:
     logger.warning("google-generativeai no disponible")
-    pass
+
+# HTTP/2 requiere el paquete h2 (httpx[http2])
+HTTP2_AVAILABLE = _modulo_disponible("h2")
+
+# PyMuPDF extrae solo los bloques de texto (mucho más rápido que pdfplumber en PDFs con gráficos)
+PYMUPDF_AVAILABLE = _modulo_disponible("fitz")
+
+# OCR opcional para páginas escaneadas (requiere el binario tesseract instalado)
+OCR_AVAILABLE = _modulo_disponible("pytesseract")
+
+
+@lru_cache(maxsize=None)
+def _anthropic():
+    import anthropic
+    return anthropic
+
+
+@lru_cache(maxsize=None)
+def _openai():
+    import openai
+    return openai
 
 
-@dataclass
+@lru_cache(maxsize=None)
+def _genai():
+    import google.generativeai as genai
+    return genai
+
+
+@lru_cache(maxsize=None)
+def _pdfplumber():
+    import pdfplumber
+    return pdfplumber
+
+
+@lru_cache(maxsize=None)
+def _fitz():
+    import fitz
+    return fitz
+
+
+@lru_cache(maxsize=None)
+def _pytesseract():
+    import pytesseract
+    return pytesseract
+
+
+# Caché idEvl -> URL del pliego técnico: la resolución no cambia para un mismo expediente
+_RE_ID_EVL = re.compile(r"idEvl=([^&#]+)")
+_URL_PLIEGO_TECNICO_CACHE: "OrderedDict[str, str]" = OrderedDict()
+_URL_PLIEGO_TECNICO_CACHE_MAX = 4096
+
+_RE_PALABRA = re.compile(r"\S+")
+
+
+def _extract_json(text: str) -> Optional[Dict]:
+    """
+    Extrae el primer objeto JSON de la respuesta de la IA.
+    Recorre el texto una sola vez contando llaves (respetando strings y escapes),
+    así evita el backtracking de la regex y descarta JSON/comentarios sobrantes al final.
+    """
+    inicio = text.find("{")
+    if inicio == -1:
+        return None
+
+    depth = 0
+    in_string = False
+    escape = False
+    for i in range(inicio, len(text)):
+        c = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                return orjson.loads(text[inicio:i + 1])
+
+    return None
+
+
+@dataclass(slots=True)
 class ITComponente:
     """Componente IT detectado en el pliego"""
     tipo: str  # infraestructura, software, servicios, comunicaciones, seguridad
@@ -61,7 +150,7 @@ class ITComponente:
     pagina: Optional[int] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class ImpactoNegocio:
     """Impacto cuantificable del dolor en el negocio"""
     descripcion: str  # Descripción del impacto
@@ -69,7 +158,7 @@ class ImpactoNegocio:
     area_afectada: str  # Área de negocio afectada
 
 
-@dataclass
+@dataclass(slots=True)
 class UrgenciaTemporal:
     """Urgencia temporal del dolor"""
     nivel: str  # critico, alto, medio, bajo
@@ -78,7 +167,7 @@ class UrgenciaTemporal:
     consecuencias_retraso: str  # Qué pasa si no se resuelve a tiempo
 
 
-@dataclass
+@dataclass(slots=True)
 class SolucionSRS:
     """Mapeo de la solución SRS para este dolor"""
     servicio_principal: str  # Servicio principal del catálogo SRS
@@ -87,7 +176,7 @@ class SolucionSRS:
     equipo_necesario: str  # Recursos humanos necesarios
 
 
-@dataclass
+@dataclass(slots=True)
 class ArgumentoVenta:
     """Argumentos de venta para este dolor"""
     gancho: str  # Frase inicial para captar atención
@@ -95,14 +184,14 @@ class ArgumentoVenta:
     prueba_social: str  # Caso de éxito similar
 
 
-@dataclass
+@dataclass(slots=True)
 class ObjecionPrevisible:
     """Objeción previsible y respuesta preparada"""
     objecion: str  # La objeción esperada
     respuesta: str  # Respuesta preparada
 
 
-@dataclass
+@dataclass(slots=True)
 class DolorDetectado:
     """Dolor/necesidad específica del cliente - Estructura enriquecida"""
     # Clasificación
@@ -129,7 +218,7 @@ class DolorDetectado:
     confianza_deteccion: int  # 0-100
 
 
-@dataclass
+@dataclass(slots=True)
 class ResumenOperador:
     """Resumen orientado al OPERADOR para preparar el contacto comercial"""
     # Contexto rápido
@@ -161,7 +250,7 @@ class ResumenOperador:
     confianza_analisis: str  # alta, media, baja
 
 
-@dataclass
+@dataclass(slots=True)
 class AnalisisPliego:
     """Resultado completo del análisis de pliego"""
     oportunidad_id: str
@@ -196,6 +285,62 @@ class AnalisisPliego:
         return result
 
 
+def _build_dolor(d: Dict) -> DolorDetectado:
+    """Construye un DolorDetectado completo desde el JSON de la IA"""
+    impacto_data = d.get("impacto_negocio", {})
+    urgencia_data = d.get("urgencia_temporal", {})
+    solucion_data = d.get("solucion_srs", {})
+    argumento_data = d.get("argumento_venta", {})
+
+    if isinstance(argumento_data, str):
+        # Compatibilidad con formato antiguo
+        argumento_venta = ArgumentoVenta(
+            gancho=argumento_data,
+            diferenciador="",
+            prueba_social=""
+        )
+    else:
+        argumento_venta = ArgumentoVenta(
+            gancho=argumento_data.get("gancho", ""),
+            diferenciador=argumento_data.get("diferenciador", ""),
+            prueba_social=argumento_data.get("prueba_social", "")
+        )
+
+    return DolorDetectado(
+        categoria=d.get("categoria", "tecnico"),
+        subcategoria=d.get("subcategoria", "general"),
+        severidad=d.get("severidad", "medio"),
+        descripcion=d.get("descripcion", ""),
+        extracto_pliego=d.get("extracto_pliego", ""),
+        impacto_negocio=ImpactoNegocio(
+            descripcion=impacto_data.get("descripcion", d.get("impacto", "")),
+            cuantificacion=impacto_data.get("cuantificacion", "No cuantificado"),
+            area_afectada=impacto_data.get("area_afectada", "general")
+        ),
+        urgencia_temporal=UrgenciaTemporal(
+            nivel=urgencia_data.get("nivel", "medio"),
+            fecha_limite=urgencia_data.get("fecha_limite"),
+            dias_restantes=urgencia_data.get("dias_restantes"),
+            consecuencias_retraso=urgencia_data.get("consecuencias_retraso", "")
+        ),
+        solucion_srs=SolucionSRS(
+            servicio_principal=solucion_data.get("servicio_principal", "Soporte técnico"),
+            servicios_complementarios=solucion_data.get("servicios_complementarios", []),
+            tiempo_implementacion=solucion_data.get("tiempo_implementacion", "A determinar"),
+            equipo_necesario=solucion_data.get("equipo_necesario", "A determinar")
+        ),
+        argumento_venta=argumento_venta,
+        objeciones_previsibles=[
+            ObjecionPrevisible(
+                objecion=obj.get("objecion", ""),
+                respuesta=obj.get("respuesta", "")
+            )
+            for obj in d.get("objeciones_previsibles", [])
+        ],
+        confianza_deteccion=d.get("confianza_deteccion", 50)
+    )
+
+
 class PliegoAnalyzer:
     """
     Analizador EXHAUSTIVO de pliegos.
@@ -256,52 +401,82 @@ class PliegoAnalyzer:
                     "movimiento de tierras", "excavación"],
     }
 
+    # Certificaciones a detectar (precompiladas una sola vez)
+    PATRONES_CERTIFICACIONES = {
+        "ENS": re.compile(r"\bens\b|esquema nacional de seguridad"),
+        "ISO 27001": re.compile(r"iso\s*27001|iso-27001"),
+        "ISO 20000": re.compile(r"iso\s*20000|iso-20000"),
+        "ISO 9001": re.compile(r"iso\s*9001|iso-9001"),
+        "RGPD": re.compile(r"\brgpd\b|reglamento general de protección"),
+        "LOPD": re.compile(r"\blopd\b|ley orgánica de protección"),
+        "SOC 2": re.compile(r"soc\s*2|soc-2"),
+        "PCI DSS": re.compile(r"pci[\s-]*dss"),
+    }
+
+    # Documentos parseados que se mantienen en memoria (url -> texto, páginas, tipo)
+    PARSE_CACHE_MAX = 32
+
     def __init__(self):
         self.anthropic_client = None
         self.openai_client = None
         self.gemini_model = None
+        # url -> (texto, páginas, palabras, tipo_doc, hash_doc)
+        self._parse_cache: "OrderedDict[str, Tuple[str, int, int, str, str]]" = OrderedDict()
+
+        # Cliente HTTP compartido: reutiliza conexiones TLS (keep-alive) y HTTP/2
+        # entre descargas de PLACSP en lugar de abrir un cliente por petición
+        self._http = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(30.0, read=120.0),  # 2 minutos de lectura para descargas grandes
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+            follow_redirects=True,
+            headers={"User-Agent": self.USER_AGENT}
+        )
 
         # Configurar Gemini (PRIORIDAD - gemini-2.0-flash)
         if GEMINI_AVAILABLE and os.getenv("GOOGLE_API_KEY"):
-            genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-            self.gemini_model = genai.GenerativeModel("gemini-2.0-flash")
+            _genai().configure(api_key=os.getenv("GOOGLE_API_KEY"))
+            self.gemini_model = _genai().GenerativeModel("gemini-2.0-flash")
             logger.info("PliegoAnalyzer: Gemini 2.0 Flash configurado (PRINCIPAL)")
 
         # Configurar OpenAI como primer fallback
         if OPENAI_AVAILABLE and os.getenv("OPENAI_API_KEY"):
-            self.openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+            self.openai_client = _openai().AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
             logger.info("PliegoAnalyzer: OpenAI configurado como fallback #1")
 
         # Configurar Anthropic Claude como último fallback (deshabilitado por defecto)
         if ANTHROPIC_AVAILABLE and os.getenv("ANTHROPIC_API_KEY"):
-            self.anthropic_client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+            self.anthropic_client = _anthropic().AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
             logger.info("PliegoAnalyzer: Anthropic Claude configurado como fallback #2 (último)")
 
         if not self.gemini_model and not self.openai_client and not self.anthropic_client:
             logger.warning("PliegoAnalyzer: Ningún proveedor IA disponible - solo análisis básico")
 
+    async def aclose(self):
+        """Cierra el pool de conexiones HTTP compartido y los clientes IA"""
+        await self._http.aclose()
+        if self.openai_client:
+            await self.openai_client.close()
+        if self.anthropic_client:
+            await self.anthropic_client.close()
+
     async def descargar_documento(self, url: str) -> Tuple[Optional[bytes], str]:
         """Descarga documento de PLACSP o URL directa"""
         try:
-            async with httpx.AsyncClient(
-                timeout=120.0,  # 2 minutos para descargas grandes
-                follow_redirects=True,
-                headers={"User-Agent": self.USER_AGENT}
-            ) as client:
-                response = await client.get(url)
-                response.raise_for_status()
+            response = await self._http.get(url)
+            response.raise_for_status()
 
-                content_type = response.headers.get("content-type", "").lower()
+            content_type = response.headers.get("content-type", "").lower()
 
-                if "pdf" in content_type or url.lower().endswith(".pdf"):
+            if "pdf" in content_type or url.lower().endswith(".pdf"):
+                return response.content, "pdf"
+            elif "html" in content_type or "text" in content_type:
+                return response.content, "html"
+            else:
+                # Intentar detectar por magic bytes
+                if response.content[:4] == b'%PDF':
                     return response.content, "pdf"
-                elif "html" in content_type or "text" in content_type:
-                    return response.content, "html"
-                else:
-                    # Intentar detectar por magic bytes
-                    if response.content[:4] == b'%PDF':
-                        return response.content, "pdf"
-                    return response.content, "html"
+                return response.content, "html"
 
         except Exception as e:
             logger.error(f"Error descargando {url}: {e}")
@@ -316,96 +491,113 @@ class PliegoAnalyzer:
         1. Pliego de Prescripciones Técnicas (PPT)
         2. Pliego Técnico
         3. Cualquier documento técnico con GetDocumentsById
+
+        El resultado se cachea por idEvl para no volver a descargar y parsear
+        la página de detalle en re-análisis o en el flujo v1 + v2.
         """
+        match = _RE_ID_EVL.search(url_licitacion)
+        id_evl = match.group(1) if match else None
+
+        if id_evl and id_evl in _URL_PLIEGO_TECNICO_CACHE:
+            _URL_PLIEGO_TECNICO_CACHE.move_to_end(id_evl)
+            logger.info(f"Pliego técnico en caché para idEvl={id_evl}")
+            return _URL_PLIEGO_TECNICO_CACHE[id_evl]
+
+        url = await self._buscar_url_pliego_tecnico(url_licitacion)
+
+        if url and id_evl:
+            _URL_PLIEGO_TECNICO_CACHE[id_evl] = url
+            if len(_URL_PLIEGO_TECNICO_CACHE) > _URL_PLIEGO_TECNICO_CACHE_MAX:
+                _URL_PLIEGO_TECNICO_CACHE.popitem(last=False)
+
+        return url
+
+    async def _buscar_url_pliego_tecnico(self, url_licitacion: str) -> Optional[str]:
+        """Descarga la página de detalle de PLACSP y localiza el enlace al pliego técnico"""
         try:
-            async with httpx.AsyncClient(
-                timeout=60.0,
-                follow_redirects=True,
-                headers={"User-Agent": self.USER_AGENT}
-            ) as client:
-                response = await client.get(url_licitacion)
-                response.raise_for_status()
-
-                soup = BeautifulSoup(response.content, "html.parser")
-                html_text = response.text.lower()
-
-                # Patrones por orden de prioridad (más específico primero)
-                patrones_pliego_tecnico = [
-                    "pliego prescripciones técnicas",
-                    "pliego de prescripciones técnicas",
-                    "prescripciones técnicas",
-                    "prescripciones tecnicas",  # sin tilde
-                    "pliego técnico",
-                    "pliego tecnico",  # sin tilde
-                    "ppt",
-                    "condiciones técnicas",
-                    "especificaciones técnicas",
-                    "anexo técnico",
-                    "anexo tecnico",
-                ]
-
-                encontrados = []  # Lista de (prioridad, url)
-
-                # Buscar en todos los enlaces
-                for link in soup.find_all('a', href=True):
-                    texto_link = link.get_text(strip=True).lower()
-                    href = link.get('href', '')
-
-                    # Solo considerar enlaces a documentos
-                    if not ('GetDocumentsById' in href or '.pdf' in href.lower()):
-                        continue
-
-                    # Construir URL completa si es relativa
-                    if href.startswith('/'):
-                        href = f"https://contrataciondelestado.es{href}"
-                    elif not href.startswith('http'):
-                        continue
-
-                    # Verificar prioridad por patrón
-                    for idx, patron in enumerate(patrones_pliego_tecnico):
-                        if patron in texto_link:
-                            encontrados.append((idx, href, texto_link))
-                            logger.info(f"Candidato pliego técnico (prioridad {idx}): {texto_link[:50]}... -> {href[:80]}...")
-                            break
-
-                # Segunda pasada: buscar por estructura de tabla de documentos
-                for row in soup.find_all('tr'):
-                    cells = row.find_all(['td', 'th'])
-                    row_text = ' '.join([c.get_text(strip=True).lower() for c in cells])
-
-                    for idx, patron in enumerate(patrones_pliego_tecnico):
-                        if patron in row_text:
-                            # Buscar enlace en esta fila
-                            for link in row.find_all('a', href=True):
-                                href = link.get('href', '')
-                                if 'GetDocumentsById' in href or '.pdf' in href.lower():
-                                    if href.startswith('/'):
-                                        href = f"https://contrataciondelestado.es{href}"
-                                    encontrados.append((idx, href, row_text[:50]))
-                                    logger.info(f"Candidato en tabla (prioridad {idx}): {row_text[:50]}...")
-                            break
-
-                # Seleccionar el de mayor prioridad (menor índice)
-                if encontrados:
-                    encontrados.sort(key=lambda x: x[0])
-                    mejor = encontrados[0]
-                    logger.info(f"Seleccionado pliego técnico: {mejor[2][:50]}... -> {mejor[1][:80]}...")
-                    return mejor[1]
-
-                # Fallback: buscar cualquier GetDocumentsById que parezca un documento principal
-                for link in soup.find_all('a', href=True):
-                    href = link.get('href', '')
-                    if 'GetDocumentsById' in href:
-                        texto = link.get_text(strip=True).lower()
-                        # Evitar documentos claramente administrativos
-                        if not any(x in texto for x in ['administrativ', 'carátula', 'anuncio', 'resolución']):
-                            if href.startswith('/'):
-                                href = f"https://contrataciondelestado.es{href}"
-                            logger.info(f"Fallback - documento encontrado: {texto[:50]}... -> {href[:80]}...")
-                            return href
-
-                logger.warning(f"No se encontró pliego técnico en {url_licitacion}")
-                return None
+            response = await self._http.get(url_licitacion, timeout=60.0)
+            response.raise_for_status()
+
+            soup = BeautifulSoup(response.content, "html.parser")
+            html_text = response.text.lower()
+
+            # Patrones por orden de prioridad (más específico primero)
+            patrones_pliego_tecnico = [
+                "pliego prescripciones técnicas",
+                "pliego de prescripciones técnicas",
+                "prescripciones técnicas",
+                "prescripciones tecnicas",  # sin tilde
+                "pliego técnico",
+                "pliego tecnico",  # sin tilde
+                "ppt",
+                "condiciones técnicas",
+                "especificaciones técnicas",
+                "anexo técnico",
+                "anexo tecnico",
+            ]
+
+            encontrados = []  # Lista de (prioridad, url)
+
+            # Buscar en todos los enlaces
+            for link in soup.find_all('a', href=True):
+                texto_link = link.get_text(strip=True).lower()
+                href = link.get('href', '')
+
+                # Solo considerar enlaces a documentos
+                if not ('GetDocumentsById' in href or '.pdf' in href.lower()):
+                    continue
+
+                # Construir URL completa si es relativa
+                if href.startswith('/'):
+                    href = f"https://contrataciondelestado.es{href}"
+                elif not href.startswith('http'):
+                    continue
+
+                # Verificar prioridad por patrón
+                for idx, patron in enumerate(patrones_pliego_tecnico):
+                    if patron in texto_link:
+                        encontrados.append((idx, href, texto_link))
+                        logger.info(f"Candidato pliego técnico (prioridad {idx}): {texto_link[:50]}... -> {href[:80]}...")
+                        break
+
+            # Segunda pasada: buscar por estructura de tabla de documentos
+            for row in soup.find_all('tr'):
+                cells = row.find_all(['td', 'th'])
+                row_text = ' '.join([c.get_text(strip=True).lower() for c in cells])
+
+                for idx, patron in enumerate(patrones_pliego_tecnico):
+                    if patron in row_text:
+                        # Buscar enlace en esta fila
+                        for link in row.find_all('a', href=True):
+                            href = link.get('href', '')
+                            if 'GetDocumentsById' in href or '.pdf' in href.lower():
+                                if href.startswith('/'):
+                                    href = f"https://contrataciondelestado.es{href}"
+                                encontrados.append((idx, href, row_text[:50]))
+                                logger.info(f"Candidato en tabla (prioridad {idx}): {row_text[:50]}...")
+                        break
+
+            # Seleccionar el de mayor prioridad (menor índice)
+            if encontrados:
+                encontrados.sort(key=lambda x: x[0])
+                mejor = encontrados[0]
+                logger.info(f"Seleccionado pliego técnico: {mejor[2][:50]}... -> {mejor[1][:80]}...")
+                return mejor[1]
+
+            # Fallback: buscar cualquier GetDocumentsById que parezca un documento principal
+            for link in soup.find_all('a', href=True):
+                href = link.get('href', '')
+                if 'GetDocumentsById' in href:
+                    texto = link.get_text(strip=True).lower()
+                    # Evitar documentos claramente administrativos
+                    if not any(x in texto for x in ['administrativ', 'carátula', 'anuncio', 'resolución']):
+                        if href.startswith('/'):
+                            href = f"https://contrataciondelestado.es{href}"
+                        logger.info(f"Fallback - documento encontrado: {texto[:50]}... -> {href[:80]}...")
+                        return href
+
+            logger.warning(f"No se encontró pliego técnico en {url_licitacion}")
+            return None
 
         except Exception as e:
             logger.error(f"Error extrayendo URL pliego técnico: {e}")
@@ -413,16 +605,19 @@ class PliegoAnalyzer:
 
     def extraer_texto_pdf(self, pdf_bytes: bytes, max_paginas: int = 150) -> Tuple[str, int]:
         """
-        Extrae texto de PDF usando pdfplumber.
+        Extrae texto de PDF usando PyMuPDF (o pdfplumber si no está instalado).
         Limita a max_paginas para evitar timeouts en PDFs muy grandes.
         Las primeras páginas suelen contener la info más relevante.
         """
+        if PYMUPDF_AVAILABLE:
+            return self._extraer_texto_pdf_pymupdf(pdf_bytes, max_paginas)
+
         texto_completo = []
         paginas = 0
         paginas_procesadas = 0
 
         try:
-            with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
+            with _pdfplumber().open(BytesIO(pdf_bytes)) as pdf:
                 paginas = len(pdf.pages)
                 # Limitar páginas a procesar
                 paginas_a_procesar = min(paginas, max_paginas)
@@ -445,6 +640,93 @@ class PliegoAnalyzer:
 
         return "\n\n".join(texto_completo), paginas
 
+    def _extraer_texto_pdf_pymupdf(self, pdf_bytes: bytes, max_paginas: int) -> Tuple[str, int]:
+        """
+        Extrae solo los bloques de texto de cada página con get_text("blocks"),
+        sin interpretar los trazados de organigramas, logos y portadas.
+        Las páginas escaneadas (sin texto pero con imágenes) se pasan por OCR una a una.
+        """
+        texto_completo = []
+        paginas = 0
+
+        try:
+            with _fitz().open(stream=pdf_bytes, filetype="pdf") as doc:
+                paginas = doc.page_count
+                paginas_a_procesar = min(paginas, max_paginas)
+
+                if paginas > max_paginas:
+                    logger.warning(f"PDF muy grande ({paginas} págs), limitando a {max_paginas} páginas")
+
+                for i in range(paginas_a_procesar):
+                    page = doc.load_page(i)
+                    # Bloques: (x0, y0, x1, y1, texto, nº bloque, tipo) - tipo 0 = texto
+                    texto = "\n".join(
+                        b[4].strip() for b in page.get_text("blocks") if b[6] == 0 and b[4].strip()
+                    )
+
+                    if len(texto) < 20 and OCR_AVAILABLE and page.get_images():
+                        texto = self._ocr_pagina(page) or texto
+
+                    if texto:
+                        texto_completo.append(texto)
+
+                    # Log progreso cada 50 páginas
+                    if (i + 1) % 50 == 0:
+                        logger.info(f"Extracción PDF: {i + 1}/{paginas_a_procesar} páginas...")
+
+        except Exception as e:
+            logger.error(f"Error extrayendo texto PDF: {e}")
+
+        return "\n\n".join(texto_completo), paginas
+
+    def _ocr_pagina(self, page) -> str:
+        """OCR de una sola página escaneada"""
+        try:
+            from PIL import Image
+
+            pix = page.get_pixmap(dpi=200)
+            imagen = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+            return _pytesseract().image_to_string(imagen, lang="spa").strip()
+        except Exception as e:
+            logger.warning(f"OCR fallido en página {page.number + 1}: {e}")
+            return ""
+
+    async def _get_texto(self, url: str) -> Tuple[str, int, int, str, str]:
+        """
+        Descarga y extrae el texto de un documento, cacheado por URL.
+        Evita repetir descarga + parseo del mismo pliego entre analizar_pliego y el análisis comercial v2.
+        Devuelve (texto, paginas, palabras, tipo_doc, hash_doc); tipo_doc es "error" si no se pudo descargar.
+        Las palabras se cuentan una sola vez aquí y se reutilizan en la metadata.
+        hash_doc es la huella de los bytes descargados (clave de la caché de extracciones IA).
+        """
+        if url in self._parse_cache:
+            self._parse_cache.move_to_end(url)
+            logger.info(f"Texto del pliego en caché: {url[:80]}...")
+            return self._parse_cache[url]
+
+        contenido, tipo_doc = await self.descargar_documento(url)
+        if not contenido:
+            return "", 0, 0, "error", ""
+        logger.info(f"Descarga completada: {tipo_doc}, {len(contenido)} bytes")
+        from app.spotter.spotter_cache import hash_documento
+        hash_doc = hash_documento(contenido)
+
+        if tipo_doc == "pdf":
+            texto, paginas = self.extraer_texto_pdf(contenido)
+        else:
+            texto = self.extraer_texto_html(contenido)
+            paginas = 1
+
+        # Contar sin materializar la lista de palabras de texto.split()
+        palabras = sum(1 for _ in _RE_PALABRA.finditer(texto))
+
+        if texto:
+            self._parse_cache[url] = (texto, paginas, palabras, tipo_doc, hash_doc)
+            if len(self._parse_cache) > self.PARSE_CACHE_MAX:
+                self._parse_cache.popitem(last=False)
+
+        return texto, paginas, palabras, tipo_doc, hash_doc
+
     def extraer_texto_html(self, html_bytes: bytes) -> str:
         """Extrae texto de HTML"""
         try:
@@ -465,36 +747,27 @@ class PliegoAnalyzer:
             logger.error(f"Error extrayendo texto HTML: {e}")
             return ""
 
-    def _detectar_tecnologias(self, texto: str) -> List[str]:
+    @classmethod
+    def _detectar_tecnologias(cls, texto: str) -> List[str]:
         """Detecta tecnologías IT mencionadas"""
         texto_lower = texto.lower()
         encontradas = []
 
-        for tech in self.TECNOLOGIAS_IT:
+        for tech in cls.TECNOLOGIAS_IT:
             if tech.lower() in texto_lower:
                 # Capitalizar correctamente
                 encontradas.append(tech.title() if len(tech) > 3 else tech.upper())
 
         return list(set(encontradas))
 
-    def _detectar_certificaciones(self, texto: str) -> List[str]:
+    @classmethod
+    def _detectar_certificaciones(cls, texto: str) -> List[str]:
         """Detecta certificaciones requeridas"""
         certs = []
         texto_lower = texto.lower()
 
-        patrones = {
-            "ENS": r"\bens\b|esquema nacional de seguridad",
-            "ISO 27001": r"iso\s*27001|iso-27001",
-            "ISO 20000": r"iso\s*20000|iso-20000",
-            "ISO 9001": r"iso\s*9001|iso-9001",
-            "RGPD": r"\brgpd\b|reglamento general de protección",
-            "LOPD": r"\blopd\b|ley orgánica de protección",
-            "SOC 2": r"soc\s*2|soc-2",
-            "PCI DSS": r"pci[\s-]*dss",
-        }
-
-        for cert, patron in patrones.items():
-            if re.search(patron, texto_lower):
+        for cert, patron in cls.PATRONES_CERTIFICACIONES.items():
+            if patron.search(texto_lower):
                 certs.append(cert)
 
         return certs
@@ -658,8 +931,7 @@ RESPONDE SOLO JSON, sin explicaciones adicionales."""
 
             # Timeout de 90 segundos para la llamada a Claude
             response = await asyncio.wait_for(
-                asyncio.to_thread(
-                    self.anthropic_client.messages.create,
+                self.anthropic_client.messages.create(
                     model="claude-sonnet-4-20250514",
                     max_tokens=4000,
                     messages=[{"role": "user", "content": prompt}],
@@ -671,9 +943,9 @@ RESPONDE SOLO JSON, sin explicaciones adicionales."""
             logger.info(f"Respuesta recibida de Claude ({len(text)} caracteres)")
 
             # Extraer JSON
-            json_match = re.search(r"\{[\s\S]*\}", text)
-            if json_match:
-                return json.loads(json_match.group())
+            resultado = _extract_json(text)
+            if resultado:
+                return resultado
 
             logger.warning("No se pudo extraer JSON de la respuesta de Claude")
             return None
@@ -697,8 +969,7 @@ RESPONDE SOLO JSON, sin explicaciones adicionales."""
 
             # Timeout de 90 segundos para la llamada a OpenAI
             response = await asyncio.wait_for(
-                asyncio.to_thread(
-                    self.openai_client.chat.completions.create,
+                self.openai_client.chat.completions.create(
                     model="gpt-4o",  # Modelo más potente para análisis profundo
                     messages=[{"role": "user", "content": prompt}],
                     max_tokens=4000,
@@ -711,9 +982,9 @@ RESPONDE SOLO JSON, sin explicaciones adicionales."""
             logger.info(f"Respuesta recibida de OpenAI ({len(text)} caracteres)")
 
             # Extraer JSON
-            json_match = re.search(r"\{[\s\S]*\}", text)
-            if json_match:
-                return json.loads(json_match.group())
+            resultado = _extract_json(text)
+            if resultado:
+                return resultado
 
             logger.warning("No se pudo extraer JSON de la respuesta de OpenAI")
             return None
@@ -737,10 +1008,9 @@ RESPONDE SOLO JSON, sin explicaciones adicionales."""
 
             # Timeout de 90 segundos
             response = await asyncio.wait_for(
-                asyncio.to_thread(
-                    self.gemini_model.generate_content,
+                self.gemini_model.generate_content_async(
                     prompt,
-                    generation_config=genai.GenerationConfig(
+                    generation_config=_genai().GenerationConfig(
                         temperature=0.3,
                         max_output_tokens=4000,
                     )
@@ -752,9 +1022,9 @@ RESPONDE SOLO JSON, sin explicaciones adicionales."""
             logger.info(f"Respuesta recibida de Gemini ({len(text)} caracteres)")
 
             # Extraer JSON
-            json_match = re.search(r"\{[\s\S]*\}", text)
-            if json_match:
-                return json.loads(json_match.group())
+            resultado = _extract_json(text)
+            if resultado:
+                return resultado
 
             logger.warning("No se pudo extraer JSON de la respuesta de Gemini")
             return None
@@ -766,7 +1036,8 @@ RESPONDE SOLO JSON, sin explicaciones adicionales."""
             logger.error(f"Error en análisis Gemini: {e}")
             return None
 
-    def _analisis_basico(self, texto: str, objeto: str, importe: float) -> Dict:
+    @classmethod
+    def _analisis_basico(cls, texto: str, objeto: str, importe: float) -> Dict:
         """Análisis básico sin IA (fallback)"""
         texto_lower = texto.lower()
 
@@ -786,7 +1057,7 @@ RESPONDE SOLO JSON, sin explicaciones adicionales."""
         if tiene_drones:
             pain_score += 20  # Drones/cartografía es línea estratégica
 
-        for categoria, keywords in self.KEYWORDS_DOLOR.items():
+        for categoria, keywords in cls.KEYWORDS_DOLOR.items():
             for kw in keywords:
                 if kw.lower() in texto_lower:
                     pain_score += 10
@@ -794,8 +1065,8 @@ RESPONDE SOLO JSON, sin explicaciones adicionales."""
         pain_score = min(100, pain_score)
 
         # Detectar tecnologías y certificaciones
-        tecnologias = self._detectar_tecnologias(texto)
-        certificaciones = self._detectar_certificaciones(texto)
+        tecnologias = cls._detectar_tecnologias(texto)
+        certificaciones = cls._detectar_certificaciones(texto)
 
         if certificaciones:
             pain_score += 10
@@ -868,12 +1139,11 @@ RESPONDE SOLO JSON, sin explicaciones adicionales."""
             else:
                 logger.warning(f"[PLIEGO] [{_time.time()-_start:.1f}s] No se encontró pliego técnico")
 
-        # 1. Descargar documento
-        logger.info(f"[PLIEGO] [{_time.time()-_start:.1f}s] Descargando documento...")
-        contenido, tipo_doc = await self.descargar_documento(url_final)
-        logger.info(f"[PLIEGO] [{_time.time()-_start:.1f}s] Descarga completada: {tipo_doc}, {len(contenido) if contenido else 0} bytes")
+        # 1-2. Descargar documento y extraer texto (cacheado por URL)
+        logger.info(f"[PLIEGO] [{_time.time()-_start:.1f}s] Descargando y extrayendo documento...")
+        texto, paginas, palabras, tipo_doc, _ = await self._get_texto(url_final)
 
-        if not contenido:
+        if tipo_doc == "error":
             return AnalisisPliego(
                 oportunidad_id=oportunidad_id,
                 tiene_it=False,
@@ -907,15 +1177,6 @@ RESPONDE SOLO JSON, sin explicaciones adicionales."""
                 error="No se pudo descargar el documento"
             )
 
-        # 2. Extraer texto
-        logger.info(f"[PLIEGO] [{_time.time()-_start:.1f}s] Extrayendo texto de {tipo_doc}...")
-        if tipo_doc == "pdf":
-            texto, paginas = self.extraer_texto_pdf(contenido)
-        else:
-            texto = self.extraer_texto_html(contenido)
-            paginas = 1
-
-        palabras = len(texto.split())
         logger.info(f"[PLIEGO] [{_time.time()-_start:.1f}s] Extraídas {palabras} palabras de {paginas} páginas")
 
         if not texto or len(texto) < 100:
@@ -984,11 +1245,21 @@ RESPONDE SOLO JSON, sin explicaciones adicionales."""
         # Último recurso: análisis básico
         if not resultado_ia:
             logger.warning(f"[PLIEGO] [{_time.time()-_start:.1f}s] Fallback a análisis básico")
-            resultado_ia = self._analisis_basico(texto, objeto, importe)
+            resultado_ia = await asyncio.get_running_loop().run_in_executor(
+                _get_cpu_pool(), PliegoAnalyzer._analisis_basico, texto, objeto, importe
+            )
 
         # 4. Detectar tecnologías y certificaciones (adicional)
-        tecnologias = self._detectar_tecnologias(texto)
-        certificaciones = self._detectar_certificaciones(texto)
+        if len(texto) > TEXTO_GRANDE_CPU:
+            # Pliegos enormes: las regex van al pool de procesos para no bloquear el event loop
+            loop = asyncio.get_running_loop()
+            tecnologias, certificaciones = await asyncio.gather(
+                loop.run_in_executor(_get_cpu_pool(), PliegoAnalyzer._detectar_tecnologias, texto),
+                loop.run_in_executor(_get_cpu_pool(), PliegoAnalyzer._detectar_certificaciones, texto),
+            )
+        else:
+            tecnologias = self._detectar_tecnologias(texto)
+            certificaciones = self._detectar_certificaciones(texto)
 
         # Merge con lo detectado por IA
         if "tecnologias_detectadas" in resultado_ia:
@@ -1001,83 +1272,20 @@ RESPONDE SOLO JSON, sin explicaciones adicionales."""
         logger.info(f"Análisis completado en {tiempo_total:.1f} segundos")
 
         # Construir dolores con estructura enriquecida
-        dolores = []
-        for d in resultado_ia.get("dolores", []):
-            # Construir impacto_negocio
-            impacto_data = d.get("impacto_negocio", {})
-            impacto_negocio = ImpactoNegocio(
-                descripcion=impacto_data.get("descripcion", d.get("impacto", "")),
-                cuantificacion=impacto_data.get("cuantificacion", "No cuantificado"),
-                area_afectada=impacto_data.get("area_afectada", "general")
-            )
-
-            # Construir urgencia_temporal
-            urgencia_data = d.get("urgencia_temporal", {})
-            urgencia_temporal = UrgenciaTemporal(
-                nivel=urgencia_data.get("nivel", "medio"),
-                fecha_limite=urgencia_data.get("fecha_limite"),
-                dias_restantes=urgencia_data.get("dias_restantes"),
-                consecuencias_retraso=urgencia_data.get("consecuencias_retraso", "")
-            )
-
-            # Construir solucion_srs
-            solucion_data = d.get("solucion_srs", {})
-            solucion_srs = SolucionSRS(
-                servicio_principal=solucion_data.get("servicio_principal", "Soporte técnico"),
-                servicios_complementarios=solucion_data.get("servicios_complementarios", []),
-                tiempo_implementacion=solucion_data.get("tiempo_implementacion", "A determinar"),
-                equipo_necesario=solucion_data.get("equipo_necesario", "A determinar")
-            )
-
-            # Construir argumento_venta
-            argumento_data = d.get("argumento_venta", {})
-            if isinstance(argumento_data, str):
-                # Compatibilidad con formato antiguo
-                argumento_venta = ArgumentoVenta(
-                    gancho=argumento_data,
-                    diferenciador="",
-                    prueba_social=""
-                )
-            else:
-                argumento_venta = ArgumentoVenta(
-                    gancho=argumento_data.get("gancho", ""),
-                    diferenciador=argumento_data.get("diferenciador", ""),
-                    prueba_social=argumento_data.get("prueba_social", "")
-                )
-
-            # Construir objeciones_previsibles
-            objeciones = []
-            for obj in d.get("objeciones_previsibles", []):
-                objeciones.append(ObjecionPrevisible(
-                    objecion=obj.get("objecion", ""),
-                    respuesta=obj.get("respuesta", "")
-                ))
-
-            dolores.append(DolorDetectado(
-                categoria=d.get("categoria", "tecnico"),
-                subcategoria=d.get("subcategoria", "general"),
-                severidad=d.get("severidad", "medio"),
-                descripcion=d.get("descripcion", ""),
-                extracto_pliego=d.get("extracto_pliego", ""),
-                impacto_negocio=impacto_negocio,
-                urgencia_temporal=urgencia_temporal,
-                solucion_srs=solucion_srs,
-                argumento_venta=argumento_venta,
-                objeciones_previsibles=objeciones,
-                confianza_deteccion=d.get("confianza_deteccion", 50)
-            ))
+        dolores = [_build_dolor(d) for d in resultado_ia.get("dolores", [])]
 
         # Construir componentes IT
-        componentes = []
-        for c in resultado_ia.get("componentes_it", []):
-            componentes.append(ITComponente(
+        componentes = [
+            ITComponente(
                 tipo=c.get("tipo", "servicios"),
                 nombre=c.get("nombre", ""),
                 descripcion=c.get("descripcion", ""),
                 urgencia=c.get("urgencia", "media"),
                 extracto_pliego=c.get("extracto_pliego", ""),
                 pagina=c.get("pagina")
-            ))
+            )
+            for c in resultado_ia.get("componentes_it", [])
+        ]
 
         # Construir resumen operador
         resumen = ResumenOperador(
@@ -1118,15 +1326,77 @@ RESPONDE SOLO JSON, sin explicaciones adicionales."""
         )
 
 
-# Singleton
-_pliego_analyzer: Optional[PliegoAnalyzer] = None
+# Pool de procesos para el análisis básico/regex de pliegos grandes (fuera del GIL)
+TEXTO_GRANDE_CPU = 200_000
+_cpu_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_cpu_pool() -> ProcessPoolExecutor:
+    """
+    Pool de procesos (se crea en el primer uso, ya dentro del worker de uvicorn).
+    Con forkserver los procesos salen de un servidor limpio y monohilo: hacer fork
+    del worker, que ya tiene hilos vivos (Motor, httpx), puede dejarlo bloqueado.
+    """
+    global _cpu_pool
+    if _cpu_pool is None:
+        _cpu_pool = ProcessPoolExecutor(
+            max_workers=2,
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+    return _cpu_pool
+
+
+# Pool de analizadores: cada instancia tiene sus propios clientes IA, cliente HTTP
+# y caché de parseo, así N pliegos se analizan en paralelo sin compartir estado.
+# LIFO para reutilizar primero el analizador más reciente (caché de parseo caliente).
+POOL_SIZE = 4
+_pool: Optional[asyncio.LifoQueue] = None
+_analyzers: List[PliegoAnalyzer] = []
+
+
+async def acquire_analyzer() -> PliegoAnalyzer:
+    """Obtiene un analizador libre; crea uno nuevo mientras el pool no esté lleno"""
+    global _pool
+    if _pool is None:
+        _pool = asyncio.LifoQueue()
+    if _pool.empty() and len(_analyzers) < POOL_SIZE:
+        analyzer = PliegoAnalyzer()
+        _analyzers.append(analyzer)
+        return analyzer
+    return await _pool.get()
+
+
+def release_analyzer(analyzer: PliegoAnalyzer):
+    """
+    Devuelve el analizador al pool. Si el pool se cerró mientras estaba prestado
+    (cerrar_pliego_analyzer ya lo cerró), no hay a dónde devolverlo: no-op, para
+    no tapar el resultado de la petición en curso.
+    """
+    if _pool is None or analyzer not in _analyzers:
+        return
+    _pool.put_nowait(analyzer)
+
+
+@asynccontextmanager
+async def pool_ctx():
+    analyzer = await acquire_analyzer()
+    try:
+        yield analyzer
+    finally:
+        release_analyzer(analyzer)
+
 
+async def cerrar_pliego_analyzer():
+    """Libera los analizadores del pool y el pool de procesos (llamar en el shutdown de la app)"""
+    global _pool, _cpu_pool
+    for analyzer in _analyzers:
+        await analyzer.aclose()
+    _analyzers.clear()
+    _pool = None
 
-def get_pliego_analyzer() -> PliegoAnalyzer:
-    global _pliego_analyzer
-    if _pliego_analyzer is None:
-        _pliego_analyzer = PliegoAnalyzer()
-    return _pliego_analyzer
+    if _cpu_pool is not None:
+        _cpu_pool.shutdown(wait=False, cancel_futures=True)
+        _cpu_pool = None
 
 
 async def analizar_pliego_completo(
@@ -1136,16 +1406,32 @@ async def analizar_pliego_completo(
     importe: float = 0,
 ) -> Dict:
     """Función principal para análisis exhaustivo de pliego"""
-    analyzer = get_pliego_analyzer()
-    resultado = await analyzer.analizar_pliego(
-        oportunidad_id=oportunidad_id,
-        url_pliego=url_pliego,
-        objeto=objeto,
-        importe=importe
-    )
+    async with pool_ctx() as analyzer:
+        resultado = await analyzer.analizar_pliego(
+            oportunidad_id=oportunidad_id,
+            url_pliego=url_pliego,
+            objeto=objeto,
+            importe=importe
+        )
     return resultado.to_dict()
 
 
+# Modelo usado por cada proveedor en el análisis comercial v2 (orden de prioridad)
+MODELOS_V2 = {
+    "gemini": "gemini-2.0-flash",
+    "openai": "gpt-4o",
+    "anthropic": "claude-sonnet-4-20250514",
+}
+
+# Secciones sin las que una respuesta v2 se considera incompleta (no se cachea)
+CLAVES_OBLIGATORIAS_V2 = ("oportunidad", "adjudicatario")
+
+
+def _respuesta_v2_completa(resultado: Dict) -> bool:
+    """True si la respuesta IA trae las secciones obligatorias como objetos JSON"""
+    return all(isinstance(resultado.get(clave), dict) for clave in CLAVES_OBLIGATORIAS_V2)
+
+
 async def generar_analisis_comercial_v2(
     oportunidad_id: str,
     url_pliego: str,
@@ -1166,164 +1452,222 @@ async def generar_analisis_comercial_v2(
 
     Incluye: adjudicatario, dolores, servicios SRS, comunicación lista para usar, etc.
     """
-    from app.spotter.prompts import get_prompt_con_catalogo, PROMPT_VERSION
+    from app.spotter.prompts import get_prompt_partes, PROMPT_VERSION
+    from app.spotter.spotter_cache import cache_key_documento, leer_cache, guardar_cache
     from app.spotter.modelos_analisis import (
         construir_desde_json,
         construir_metadata_trazabilidad
     )
 
-    analyzer = get_pliego_analyzer()
-    inicio = datetime.now()
-
-    logger.info(f"Generando análisis comercial v2 para: {oportunidad_id}")
-    logger.info(f"Usando prompt versión: {PROMPT_VERSION}")
-
-    # 1. Descargar y extraer texto del pliego
-    url_final = url_pliego
-    if 'detalle_licitacion' in url_pliego or 'deeplink' in url_pliego:
-        url_pliego_tecnico = await analyzer.extraer_url_pliego_tecnico(url_pliego)
-        if url_pliego_tecnico:
-            url_final = url_pliego_tecnico
+    async with pool_ctx() as analyzer:
+        inicio = datetime.now()
 
-    contenido, tipo_doc = await analyzer.descargar_documento(url_final)
+        logger.info(f"Generando análisis comercial v2 para: {oportunidad_id}")
+        logger.info(f"Usando prompt versión: {PROMPT_VERSION}")
 
-    if not contenido:
-        return {
-            "error": "No se pudo descargar el documento",
-            "oportunidad": {"id_expediente": oportunidad_id}
-        }
+        # 1. Descargar y extraer texto del pliego
+        url_final = url_pliego
+        if 'detalle_licitacion' in url_pliego or 'deeplink' in url_pliego:
+            url_pliego_tecnico = await analyzer.extraer_url_pliego_tecnico(url_pliego)
+            if url_pliego_tecnico:
+                url_final = url_pliego_tecnico
 
-    paginas = 1  # Por defecto
-    if tipo_doc == "pdf":
-        texto, paginas = analyzer.extraer_texto_pdf(contenido)
-    else:
-        texto = analyzer.extraer_texto_html(contenido)
+        texto, paginas, palabras, tipo_doc, hash_doc = await analyzer._get_texto(url_final)
 
-    if not texto or len(texto) < 100:
-        return {
-            "error": "No se pudo extraer texto del documento",
-            "oportunidad": {"id_expediente": oportunidad_id}
-        }
+        if tipo_doc == "error":
+            return {
+                "error": "No se pudo descargar el documento",
+                "oportunidad": {"id_expediente": oportunidad_id}
+            }
 
-    # Truncar texto si es muy largo (máx ~60K tokens)
-    texto_truncado = texto[:80000] if len(texto) > 80000 else texto
+        if not texto or len(texto) < 100:
+            return {
+                "error": "No se pudo extraer texto del documento",
+                "oportunidad": {"id_expediente": oportunidad_id}
+            }
 
-    # 2. Generar prompt v2 con catálogo de servicios inyectado dinámicamente
-    prompt = get_prompt_con_catalogo(texto_truncado)
+        # Truncar texto si es muy largo (máx ~60K tokens)
+        texto_truncado = texto[:80000] if len(texto) > 80000 else texto
 
-    # 3. Llamar a IA (misma lógica que pliego_analyzer)
-    resultado_ia = None
-    proveedor = "basico"
+        # 2. Generar prompt v2: prefijo estático (catálogo, schema, reglas) + pliego al final,
+        #    enviados por separado para aprovechar el prompt caching de los proveedores
+        prompt_system, prompt_user = get_prompt_partes(texto_truncado)
 
-    # Intentar Gemini primero
-    if analyzer.gemini_model:
-        try:
-            response = await asyncio.wait_for(
-                asyncio.to_thread(
-                    analyzer.gemini_model.generate_content,
-                    prompt,
-                    generation_config=genai.GenerationConfig(
+        # 3. Llamar a IA (misma lógica que pliego_analyzer)
+        resultado_ia = None
+        proveedor = "basico"
+        text = ""
+        usage: Dict[str, Optional[int]] = {"in": None, "out": None}  # Tokens reportados por el proveedor
+
+        # Caché por contenido: mismo documento + versión de prompt + modelo => misma extracción
+        for prov, modelo in MODELOS_V2.items():
+            cacheado = leer_cache(cache_key_documento(modelo, hash_doc))
+            if cacheado and _respuesta_v2_completa(cacheado):
+                resultado_ia, proveedor = cacheado, prov
+                usage = {"in": 0, "out": 0}
+                logger.info(f"Análisis v2 recuperado de caché ({prov}) para: {oportunidad_id}")
+                break
+        desde_cache = resultado_ia is not None
+
+        # Intentar Gemini primero
+        if not resultado_ia and analyzer.gemini_model:
+            try:
+                response = await asyncio.wait_for(
+                    analyzer.gemini_model.generate_content_async(
+                        [prompt_system, prompt_user],
+                        generation_config=_genai().GenerationConfig(
+                            temperature=0.3,
+                            max_output_tokens=8000,  # Más tokens para respuesta completa
+                        )
+                    ),
+                    timeout=120.0  # 2 minutos para análisis completo
+                )
+                text = response.text
+                resultado_ia = _extract_json(text)
+                if resultado_ia:
+                    proveedor = "gemini"
+                    uso = getattr(response, "usage_metadata", None)
+                    if uso:
+                        usage = {"in": uso.prompt_token_count, "out": uso.candidates_token_count}
+            except Exception as e:
+                logger.error(f"Error en Gemini: {e}")
+
+        # Fallback a OpenAI
+        if not resultado_ia and analyzer.openai_client:
+            try:
+                response = await asyncio.wait_for(
+                    analyzer.openai_client.chat.completions.create(
+                        model="gpt-4o",
+                        messages=[
+                            {"role": "system", "content": prompt_system},
+                            {"role": "user", "content": prompt_user},
+                        ],
+                        max_tokens=8000,
                         temperature=0.3,
-                        max_output_tokens=8000,  # Más tokens para respuesta completa
-                    )
-                ),
-                timeout=120.0  # 2 minutos para análisis completo
-            )
-            text = response.text
-            json_match = re.search(r"\{[\s\S]*\}", text)
-            if json_match:
-                resultado_ia = json.loads(json_match.group())
-                proveedor = "gemini"
-        except Exception as e:
-            logger.error(f"Error en Gemini: {e}")
+                    ),
+                    timeout=120.0
+                )
+                text = response.choices[0].message.content
+                resultado_ia = _extract_json(text)
+                if resultado_ia:
+                    proveedor = "openai"
+                    if response.usage:
+                        usage = {"in": response.usage.prompt_tokens, "out": response.usage.completion_tokens}
+            except Exception as e:
+                logger.error(f"Error en OpenAI: {e}")
+
+        # Fallback a Anthropic
+        if not resultado_ia and analyzer.anthropic_client:
+            try:
+                response = await asyncio.wait_for(
+                    analyzer.anthropic_client.messages.create(
+                        model="claude-sonnet-4-20250514",
+                        max_tokens=8000,
+                        system=[{
+                            "type": "text",
+                            "text": prompt_system,
+                            "cache_control": {"type": "ephemeral"},
+                        }],
+                        messages=[{"role": "user", "content": prompt_user}],
+                    ),
+                    timeout=120.0
+                )
+                text = response.content[0].text
+                resultado_ia = _extract_json(text)
+                if resultado_ia:
+                    proveedor = "anthropic"
+                    if response.usage:
+                        usage = {"in": response.usage.input_tokens, "out": response.usage.output_tokens}
+            except Exception as e:
+                logger.error(f"Error en Anthropic: {e}")
 
-    # Fallback a OpenAI
-    if not resultado_ia and analyzer.openai_client:
+        if not resultado_ia:
+            return {
+                "error": "No se pudo generar análisis con IA",
+                "oportunidad": {"id_expediente": oportunidad_id}
+            }
+
+        # 4. Construir objeto de análisis comercial desde JSON. Solo se cachea una
+        #    respuesta completa y construible: una parcial o malformada se repetiría
+        #    en todos los análisis posteriores del mismo documento
         try:
-            response = await asyncio.wait_for(
-                asyncio.to_thread(
-                    analyzer.openai_client.chat.completions.create,
-                    model="gpt-4o",
-                    messages=[{"role": "user", "content": prompt}],
-                    max_tokens=8000,
-                    temperature=0.3,
-                ),
-                timeout=120.0
-            )
-            text = response.choices[0].message.content
-            json_match = re.search(r"\{[\s\S]*\}", text)
-            if json_match:
-                resultado_ia = json.loads(json_match.group())
-                proveedor = "openai"
-        except Exception as e:
-            logger.error(f"Error en OpenAI: {e}")
+            analisis = construir_desde_json(resultado_ia)
+        except (AttributeError, TypeError, ValueError) as e:
+            logger.error(f"Respuesta IA ({proveedor}) con formato no válido para {oportunidad_id}: {e}")
+            return {
+                "error": "La IA devolvió un análisis con formato no válido",
+                "oportunidad": {"id_expediente": oportunidad_id}
+            }
+
+        if not desde_cache:
+            if _respuesta_v2_completa(resultado_ia):
+                guardar_cache(cache_key_documento(MODELOS_V2[proveedor], hash_doc), resultado_ia)
+            else:
+                logger.warning(f"Respuesta IA ({proveedor}) incompleta para {oportunidad_id}: no se guarda en caché")
 
-    # Fallback a Anthropic
-    if not resultado_ia and analyzer.anthropic_client:
-        try:
-            response = await asyncio.wait_for(
-                asyncio.to_thread(
-                    analyzer.anthropic_client.messages.create,
-                    model="claude-sonnet-4-20250514",
-                    max_tokens=8000,
-                    messages=[{"role": "user", "content": prompt}],
-                ),
-                timeout=120.0
-            )
-            text = response.content[0].text
-            json_match = re.search(r"\{[\s\S]*\}", text)
-            if json_match:
-                resultado_ia = json.loads(json_match.group())
-                proveedor = "anthropic"
-        except Exception as e:
-            logger.error(f"Error en Anthropic: {e}")
+        fin = datetime.now()
+        tiempo_total = (fin - inicio).total_seconds()
+        tiempo_ms = int(tiempo_total * 1000)
+        logger.info(f"Análisis comercial v2 completado en {tiempo_total:.1f}s con {proveedor}")
 
-    if not resultado_ia:
-        return {
-            "error": "No se pudo generar análisis con IA",
-            "oportunidad": {"id_expediente": oportunidad_id}
-        }
+        # 5. Construir metadata de trazabilidad
+        modelo_usado = MODELOS_V2.get(proveedor, "desconocido")
 
-    fin = datetime.now()
-    tiempo_total = (fin - inicio).total_seconds()
-    tiempo_ms = int(tiempo_total * 1000)
-    logger.info(f"Análisis comercial v2 completado en {tiempo_total:.1f}s con {proveedor}")
-
-    # 4. Construir objeto de análisis comercial desde JSON
-    analisis = construir_desde_json(resultado_ia)
-
-    # 5. Construir metadata de trazabilidad
-    modelo_usado = {
-        "gemini": "gemini-2.0-flash",
-        "openai": "gpt-4o",
-        "anthropic": "claude-sonnet-4-20250514"
-    }.get(proveedor, "desconocido")
-
-    documentos_info = [{
-        "tipo": "pliego_tecnico" if "tecnico" in url_final.lower() else "pliego",
-        "url_origen": url_final,
-        "paginas_totales": paginas if tipo_doc == "pdf" else 1,
-        "palabras_totales": len(texto.split()) if texto else 0
-    }]
-
-    metadata = construir_metadata_trazabilidad(
-        oportunidad_id=oportunidad_id,
-        timestamp_inicio=inicio,
-        timestamp_fin=fin,
-        proveedor_ia=proveedor,
-        modelo_ia=modelo_usado,
-        tokens_entrada=int(len(prompt.split()) * 1.3),
-        tokens_salida=len(str(resultado_ia)) // 4,
-        tiempo_ms=tiempo_ms,
-        url_pliego=url_final,
-        expediente=expediente or oportunidad_id,
-        documentos=documentos_info
-    )
+        documentos_info = [{
+            "tipo": "pliego_tecnico" if "tecnico" in url_final.lower() else "pliego",
+            "url_origen": url_final,
+            "paginas_totales": paginas if tipo_doc == "pdf" else 1,
+            "palabras_totales": palabras
+        }]
 
-    # Añadir metadata al análisis
-    analisis.metadata = metadata
+        metadata = construir_metadata_trazabilidad(
+            oportunidad_id=oportunidad_id,
+            timestamp_inicio=inicio,
+            timestamp_fin=fin,
+            proveedor_ia=proveedor,
+            modelo_ia=modelo_usado,
+            # Uso real del proveedor; si no lo devuelve, estimación ~4 caracteres por token
+            tokens_entrada=usage["in"] if usage["in"] is not None else (len(prompt_system) + len(prompt_user)) // 4,
+            tokens_salida=usage["out"] if usage["out"] is not None else len(text) // 4,
+            tiempo_ms=tiempo_ms,
+            url_pliego=url_final,
+            expediente=expediente or oportunidad_id,
+            documentos=documentos_info
+        )
+
+        # Añadir metadata al análisis
+        analisis.metadata = metadata
+
+        return analisis.to_dict()
+
+
+async def generar_analisis_comercial_v2_lote(oportunidades: List[Dict]) -> List[Dict]:
+    """
+    Genera el análisis comercial v2 de varias oportunidades a la vez.
+
+    Lanza generar_analisis_comercial_v2 para cada oportunidad con asyncio.gather:
+    las llamadas son concurrentes, con como mucho POOL_SIZE en vuelo (las demás
+    esperan un analizador libre del pool). Cada una es una petición independiente
+    a la IA; no se usa ninguna API de lotes del proveedor.
+
+    Args:
+        oportunidades: kwargs de generar_analisis_comercial_v2 para cada oportunidad
+
+    Returns:
+        Resultados en el mismo orden; los fallos se devuelven como {"error": ...}
+    """
+    resultados = await asyncio.gather(
+        *[generar_analisis_comercial_v2(**opp) for opp in oportunidades],
+        return_exceptions=True
+    )
 
-    return analisis.to_dict()
+    salida = []
+    for opp, resultado in zip(oportunidades, resultados):
+        if isinstance(resultado, Exception):
+            logger.error(f"Error en análisis v2 de {opp.get('oportunidad_id')}: {resultado}")
+            resultado = {"error": str(resultado)}
+        salida.append(resultado)
+    return salida
 
 
 # Mantener función legacy para compatibilidad
@@ -1363,6 +1707,6 @@ if __name__ == "__main__":
             objeto="Servicio de soporte informático",
             importe=500000
         )
-        print(json.dumps(resultado, indent=2, ensure_ascii=False))
+        print(orjson.dumps(resultado, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode())
 
     asyncio.run(test())
@@ -6,11 +6,21 @@ Versionados para control de cambios y A/B testing.
 from .prompt_spotter_v2 import (
     PROMPT_SPOTTER_V2,
     get_prompt_con_catalogo,
+    get_prompt_partes,
+    get_prompts_con_catalogo,
+    get_prompt_bytes,
+    PROMPT_PREFIJO_ESTATICO,
     PROMPT_VERSION,
+    PROMPT_HUELLA,
 )
 
 __all__ = [
     "PROMPT_SPOTTER_V2",
     "get_prompt_con_catalogo",
+    "get_prompt_partes",
+    "get_prompts_con_catalogo",
+    "get_prompt_bytes",
+    "PROMPT_PREFIJO_ESTATICO",
     "PROMPT_VERSION",
+    "PROMPT_HUELLA",
 ]
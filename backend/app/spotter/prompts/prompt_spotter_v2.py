@@ -9,8 +9,11 @@ Versión: 2.0.0
 Fecha: 2026-01-19
 """
 
+import hashlib
 import json
-from typing import Optional
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 from app.spotter.catalogo_srs import CATALOGO_SRS, ZONAS_COBERTURA
 
 PROMPT_VERSION = "2.0.0"
@@ -411,10 +414,43 @@ Analiza el siguiente documento:
 # FUNCIONES DE GENERACIÓN
 # ═══════════════════════════════════════════════════════════════════════════════
 
-def generar_catalogo_json() -> str:
+_RE_PLACEHOLDER = re.compile(r"\{\{([A-Z_]+)\}\}")
+
+
+def _compilar_plantilla(plantilla: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
     """
-    Genera el catálogo de servicios en formato JSON para inyectar en el prompt.
+    Trocea la plantilla una sola vez en (literales, placeholders) alternos.
+    Renderizar es entonces un único join, sin recorrer ni copiar la plantilla
+    completa con str.replace por cada variable en cada llamada.
     """
+    trozos = _RE_PLACEHOLDER.split(plantilla)
+    return tuple(trozos[0::2]), tuple(trozos[1::2])
+
+
+def _renderizar(plantilla: Tuple[Tuple[str, ...], Tuple[str, ...]], valores: Dict[str, str]) -> str:
+    """Rellena una plantilla compilada con _compilar_plantilla"""
+    literales, variables = plantilla
+    partes = [literales[0]]
+    for nombre, literal in zip(variables, literales[1:]):
+        partes.append(valores[nombre])
+        partes.append(literal)
+    return "".join(partes)
+
+
+# Plantilla v2 compilada al importar
+_PLANTILLA_V2 = _compilar_plantilla(PROMPT_SPOTTER_V2)
+# Comprobación explícita (no assert: desaparecería con python -O y el prompt se
+# renderizaría mal en silencio si los placeholders cambian)
+if _PLANTILLA_V2[1] != ("CATALOGO_SERVICIOS_JSON", "CONTENIDO_PLIEGO"):
+    raise RuntimeError(
+        f"PROMPT_SPOTTER_V2: placeholders inesperados {_PLANTILLA_V2[1]}; "
+        "se esperaban {CATALOGO_SERVICIOS_JSON} y {CONTENIDO_PLIEGO}"
+    )
+_PROMPT_INICIO, _PROMPT_MEDIO, _PROMPT_SUFIJO = _PLANTILLA_V2[0]
+
+
+def _catalogo_estructurado() -> dict:
+    """Catálogo de servicios, zonas de cobertura y referencias agrupados para el prompt"""
     catalogo_estructurado = {
         "servicios": [],
         "infraestructura": [],
@@ -461,7 +497,25 @@ def generar_catalogo_json() -> str:
         ]
     }
 
-    return json.dumps(resultado, ensure_ascii=False, indent=2)
+    return resultado
+
+
+@lru_cache(maxsize=1)
+def generar_catalogo_json() -> str:
+    """
+    Genera el catálogo de servicios en formato JSON para inyectar en el prompt.
+    CATALOGO_SRS no cambia en tiempo de ejecución, así que se calcula una sola vez.
+
+    JSON compacto (sin indentación ni espacios): los espacios de indent=2 son tokens
+    de entrada que se pagan en cada llamada sin aportar nada al modelo.
+    """
+    # sort_keys: el texto debe ser idéntico byte a byte entre ejecuciones para el prompt caching
+    return json.dumps(_catalogo_estructurado(), ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+
+def generar_catalogo_json_pretty() -> str:
+    """Catálogo indentado, solo para depuración / lectura humana (no se envía a la IA)"""
+    return json.dumps(_catalogo_estructurado(), ensure_ascii=False, indent=2, sort_keys=True)
 
 
 def get_prompt_con_catalogo(contenido_pliego: str, catalogo_json: Optional[str] = None) -> str:
@@ -477,12 +531,74 @@ def get_prompt_con_catalogo(contenido_pliego: str, catalogo_json: Optional[str]
         El prompt completo listo para enviar a la IA
     """
     if catalogo_json is None:
-        catalogo_json = generar_catalogo_json()
+        return "".join((PROMPT_PREFIJO_ESTATICO, contenido_pliego, _PROMPT_SUFIJO))
+
+    return _renderizar(_PLANTILLA_V2, {
+        "CATALOGO_SERVICIOS_JSON": catalogo_json,
+        "CONTENIDO_PLIEGO": contenido_pliego,
+    })
+
+
+# Prefijo estático (instrucciones + catálogo + schema + reglas), calculado una sola vez.
+# Todo lo variable (el pliego) va al final, así cada llamada comparte un prefijo idéntico
+# y OpenAI/Anthropic/Gemini pueden reutilizarlo con prompt caching.
+PROMPT_PREFIJO_ESTATICO = "".join((_PROMPT_INICIO, generar_catalogo_json(), _PROMPT_MEDIO))
+
 
-    prompt = PROMPT_SPOTTER_V2.replace("{{CATALOGO_SERVICIOS_JSON}}", catalogo_json)
-    prompt = prompt.replace("{{CONTENIDO_PLIEGO}}", contenido_pliego)
+# Prefijo ya codificado en UTF-8 para quien envíe el prompt como bytes (httpx content=...)
+PROMPT_PREFIJO_ESTATICO_BYTES = PROMPT_PREFIJO_ESTATICO.encode("utf-8")
+_PROMPT_SUFIJO_BYTES = _PROMPT_SUFIJO.encode("utf-8")
 
-    return prompt
+# Huella del texto del prompt (plantilla + catálogo). Entra en la clave de la caché de
+# extracciones: editar la plantilla o CATALOGO_SRS invalida la caché aunque nadie
+# suba PROMPT_VERSION. El prefijo lleva su longitud para no colisionar con el sufijo.
+PROMPT_HUELLA = hashlib.sha256(
+    len(PROMPT_PREFIJO_ESTATICO_BYTES).to_bytes(8, "little")
+    + PROMPT_PREFIJO_ESTATICO_BYTES
+    + _PROMPT_SUFIJO_BYTES
+).hexdigest()
+
+
+def get_prompt_bytes(contenido_pliego: str) -> bytes:
+    """
+    Prompt completo en UTF-8 sin volver a codificar el prefijo estático en cada llamada:
+    solo se codifica el contenido del pliego.
+
+    Args:
+        contenido_pliego: El texto extraído del pliego a analizar
+
+    Returns:
+        Los mismos bytes que get_prompt_con_catalogo(contenido_pliego).encode("utf-8")
+    """
+    return b"".join((PROMPT_PREFIJO_ESTATICO_BYTES, contenido_pliego.encode("utf-8"), _PROMPT_SUFIJO_BYTES))
+
+
+def get_prompt_partes(contenido_pliego: str) -> Tuple[str, str]:
+    """
+    Devuelve el prompt separado en (system, user) para enviarlos como mensajes distintos.
+
+    Args:
+        contenido_pliego: El texto extraído del pliego a analizar
+
+    Returns:
+        Tupla (prefijo estático cacheable, contenido del pliego)
+    """
+    return PROMPT_PREFIJO_ESTATICO, contenido_pliego + _PROMPT_SUFIJO
+
+
+def get_prompts_con_catalogo(contenidos_pliegos: List[str]) -> List[Tuple[str, str]]:
+    """
+    Versión por lotes de get_prompt_partes para enviar varios pliegos a la vez
+    (peticiones concurrentes o Batch API). Todos comparten el mismo prefijo, así
+    que el servidor de inferencia lo cachea una vez y agrupa las generaciones.
+
+    Args:
+        contenidos_pliegos: Textos extraídos de los pliegos a analizar
+
+    Returns:
+        Lista de tuplas (prefijo estático cacheable, contenido del pliego), en el mismo orden
+    """
+    return [(PROMPT_PREFIJO_ESTATICO, contenido + _PROMPT_SUFIJO) for contenido in contenidos_pliegos]
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -6,43 +6,263 @@ Usa el algoritmo actualizado de SpotterSRS para reclasificar todas las
 oportunidades en la colección oportunidades_placsp.
 
 Uso:
-    python reclasificar_oportunidades.py [--dry-run]
+    python reclasificar_oportunidades.py [--dry-run] [--desde YYYY-MM-DD] [--json-out RUTA]
 
     --dry-run: Muestra los cambios sin aplicarlos a la base de datos
+    --desde:   Solo oportunidades detectadas desde esa fecha o aún sin clasificar
+               (filtrado en MongoDB; por defecto se revisan todas)
+    --json-out: Escribe los cambios en RUTA como NDJSON (un JSON por línea)
+                en lugar del detalle por pantalla (para cron / integraciones)
 """
 
 import asyncio
+import io
+import json
+import multiprocessing
 import os
 import sys
-from datetime import datetime
-from motor.motor_asyncio import AsyncIOMotorClient
-from dotenv import load_dotenv
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
 
 # Añadir el directorio padre al path para importar spotter_srs
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from spotter_srs import (
-    calcular_dolor,
-    extraer_keywords,
-    TipoOportunidad,
-)
+# motor/pymongo, dotenv y spotter_srs se importan donde se usan: importar este
+# módulo (tests, otros scripts, --help) no arrastra pymongo/ssl/dns ni las tablas
+# de keywords
 
+# Documentos por lote (lectura del cursor, análisis y bulk_write)
+BATCH_SIZE = 1000
 
-# Cargar variables de entorno
-load_dotenv(os.path.join(os.path.dirname(__file__), '..', '..', '.env'))
+# Entradas por tarea del pool de procesos: cada análisis cuesta ~20 µs, así que
+# se envían trozos para que el pickling/IPC no domine sobre el trabajo real
+TROZO_POOL = 250
 
-MONGO_URL = os.environ.get('MONGO_URL', '')
-DB_NAME = os.environ.get('DB_NAME', 'srs_crm')
+# Campos leídos de cada oportunidad: el resto del documento no viaja ni se decodifica
+PROYECCION = {
+    "_id": 1,
+    "oportunidad_id": 1,
+    "expediente": 1,
+    "objeto": 1,
+    "cpv": 1,
+    "fecha_adjudicacion": 1,
+    "dias_restantes": 1,
+    "tipo_srs": 1,
+    "score": 1,
+}
 
 
-async def reclasificar_oportunidades(dry_run: bool = False):
+def _filtro_candidatos(desde: Optional[str]) -> Dict:
+    """
+    Filtro de MongoDB para las oportunidades a revisar. Sin fecha se revisan todas
+    (un cambio de algoritmo puede mover cualquiera); con fecha, Mongo descarta en el
+    servidor las ya clasificadas antes, sin enviarlas ni analizarlas.
+    """
+    if not desde:
+        return {}
+    return {"$or": [
+        {"tipo_srs": {"$in": [None, ""]}},  # null también cubre campo ausente
+        {"fecha_deteccion": {"$gte": desde}},  # ISO 8601: orden lexicográfico = cronológico
+    ]}
+
+
+def _analizar_oportunidad(objeto: str, cpv: str, fecha_adj, dias_restantes: Optional[int]) -> Dict:
+    """
+    Recalcula keywords y dolor de una oportunidad con el algoritmo actualizado.
+    Se ejecuta en el pool de procesos, por trozos, a través de _analizar_lote.
+
+    Returns:
+        Campos a actualizar en MongoDB
+    """
+    from spotter_srs import calcular_dolor, extraer_keywords
+
+    # Extraer keywords con el algoritmo actualizado
+    keywords = extraer_keywords(objeto)
+
+    # Normalizar fecha a YYYY-MM-DD (lo habitual desde Mongo es que ya sea str: solo slice)
+    if isinstance(fecha_adj, str):
+        fecha_adj_str = fecha_adj[:10]
+    elif isinstance(fecha_adj, datetime):
+        fecha_adj_str = fecha_adj.strftime('%Y-%m-%d')
+    elif not fecha_adj:
+        fecha_adj_str = ''
+    else:
+        fecha_adj_str = str(fecha_adj)[:10]
+
+    # Calcular nuevo dolor/clasificación
+    dolor = calcular_dolor(
+        objeto=objeto,
+        fecha_adjudicacion=fecha_adj_str,
+        duracion_dias=dias_restantes,
+        cpv=cpv,
+        keywords=keywords
+    )
+
+    return {
+        "tipo_srs": dolor.tipo_oportunidad.value,
+        "keywords": list(keywords.keys()),
+        "indicadores_dolor": dolor.indicadores_urgencia,
+        "score": dolor.score_dolor,
+    }
+
+
+def _analizar_lote(entradas: List[Tuple]) -> List:
+    """
+    Analiza un trozo de entradas (objeto, cpv, fecha_adj, dias_restantes) en un solo
+    viaje al pool. El error de una entrada se devuelve en su posición, sin perder el resto.
+    """
+    resultados = []
+    for entrada in entradas:
+        try:
+            resultados.append(_analizar_oportunidad(*entrada))
+        except Exception as e:
+            resultados.append(e)
+    return resultados
+
+
+def _deduplicar(entradas: List[Tuple]) -> Tuple[List[Tuple], List[int]]:
+    """
+    Agrupa las entradas repetidas para analizarlas una sola vez.
+
+    Las entradas con valores no hashables (p.ej. un cpv o una fecha guardados como
+    lista/dict en Mongo) no se agrupan: se analizan solas y, si fallan, cuentan como
+    error de ese documento sin abortar la reclasificación.
+
+    Returns:
+        (entradas únicas, posición en las únicas de cada entrada original)
+    """
+    unicas = []
+    posiciones = []
+    indice = {}
+    for entrada in entradas:
+        try:
+            pos = indice.setdefault(entrada, len(unicas))
+        except TypeError:
+            pos = len(unicas)
+        if pos == len(unicas):
+            unicas.append(entrada)
+        posiciones.append(pos)
+    return unicas, posiciones
+
+
+async def _procesar_lote(db, pool, lote: List[Dict], cambios: List[Dict], dry_run: bool) -> Tuple[int, int]:
+    """
+    Analiza un lote de oportunidades en el pool de procesos, registra los cambios
+    de clasificación en `cambios` y los aplica con un único bulk_write.
+
+    Returns:
+        (sin_cambios, errores) del lote
+    """
+    from pymongo import UpdateOne
+
+    sin_cambios = 0
+    errores = 0
+    operaciones = []  # UpdateOne acumulados para bulk_write
+
+    # Entradas del análisis por documento; las repetidas (mismo objeto/CPV/fechas,
+    # p.ej. lotes de un mismo expediente) se analizan una sola vez
+    entradas = [
+        (
+            opp.get('objeto', ''),
+            opp.get('cpv', ''),
+            opp.get('fecha_adjudicacion', ''),
+            opp.get('dias_restantes'),
+        )
+        for opp in lote
+    ]
+    unicas, posiciones = _deduplicar(entradas)
+
+    # Analizar el lote en paralelo (CPU puro: pool de procesos), por trozos
+    loop = asyncio.get_running_loop()
+    trozos = [unicas[i:i + TROZO_POOL] for i in range(0, len(unicas), TROZO_POOL)]
+    resultados_trozos = await asyncio.gather(
+        *[loop.run_in_executor(pool, _analizar_lote, trozo) for trozo in trozos],
+        return_exceptions=True
+    )
+    resultados_unicos = []
+    for trozo, resultado in zip(trozos, resultados_trozos):
+        if isinstance(resultado, BaseException):
+            # Fallo del trozo entero (p.ej. worker caído): error en cada entrada
+            resultados_unicos.extend([resultado] * len(trozo))
+        else:
+            resultados_unicos.extend(resultado)
+    resultados = [resultados_unicos[pos] for pos in posiciones]
+
+    # Comparar con la clasificación actual
+    for opp, resultado in zip(lote, resultados):
+        if isinstance(resultado, Exception):
+            errores += 1
+            print(f"❌ Error procesando {opp.get('oportunidad_id', 'N/A')}: {resultado}")
+            continue
+
+        oportunidad_id = opp.get('oportunidad_id', 'N/A')
+        objeto = opp.get('objeto', '')
+        tipo_actual = opp.get('tipo_srs', '')
+        nuevo_tipo = resultado['tipo_srs']
+        nuevas_keywords = resultado['keywords']
+
+        if tipo_actual != nuevo_tipo:
+            cambio = {
+                'oportunidad_id': oportunidad_id,
+                'expediente': opp.get('expediente', 'N/A'),
+                'objeto': objeto[:80] + '...' if len(objeto) > 80 else objeto,
+                'tipo_anterior': tipo_actual,
+                'tipo_nuevo': nuevo_tipo,
+                'keywords': nuevas_keywords[:5],
+                'score_anterior': opp.get('score', 0),
+                'score_nuevo': resultado['score'],
+            }
+            cambios.append(cambio)
+
+            # Encolar cambio si no es dry run
+            if not dry_run:
+                # Por _id: usa siempre el índice primario
+                operaciones.append(UpdateOne(
+                    {"_id": opp["_id"]},
+                    {"$set": resultado}
+                ))
+        else:
+            sin_cambios += 1
+
+    # Aplicar los cambios del lote en un solo round-trip
+    if operaciones:
+        await db.oportunidades_placsp.bulk_write(operaciones, ordered=False)
+
+    return sin_cambios, errores
+
+
+async def reclasificar_oportunidades(
+    dry_run: bool = False,
+    desde: Optional[str] = None,
+    json_out: Optional[str] = None,
+):
     """
     Reclasifica todas las oportunidades existentes usando el algoritmo actualizado.
 
     Args:
         dry_run: Si es True, solo muestra los cambios sin aplicarlos.
+        desde: Fecha YYYY-MM-DD; si se indica, solo se revisan las oportunidades
+               detectadas desde entonces o sin clasificar.
+        json_out: Ruta de salida NDJSON; si se indica, los cambios se escriben ahí
+                  (un objeto por línea) en vez del detalle por pantalla.
     """
-    if not MONGO_URL:
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from dotenv import load_dotenv
+
+    # La salida NDJSON se trunca al empezar: ningún camino (sin documentos, sin
+    # cambios, error) deja a la vista los cambios de una ejecución anterior
+    if json_out:
+        open(json_out, "w", encoding="utf-8").close()
+
+    # Cargar variables de entorno
+    load_dotenv(os.path.join(os.path.dirname(__file__), '..', '..', '.env'))
+
+    mongo_url = os.environ.get('MONGO_URL', '')
+    db_name = os.environ.get('DB_NAME', 'srs_crm')
+
+    if not mongo_url:
         print("❌ Error: MONGO_URL no está configurada en .env")
         return
 
@@ -54,115 +274,88 @@ async def reclasificar_oportunidades(dry_run: bool = False):
 
 Modo: {'🔍 DRY RUN (sin cambios)' if dry_run else '✏️  APLICANDO CAMBIOS'}
 Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+Alcance: {f'detectadas desde {desde} o sin clasificar' if desde else 'todas las oportunidades'}
 """)
 
     # Conectar a MongoDB
     print("📡 Conectando a MongoDB...")
-    client = AsyncIOMotorClient(MONGO_URL)
-    db = client[DB_NAME]
+    client = AsyncIOMotorClient(mongo_url)
+    db = client[db_name]
 
     try:
-        # Obtener todas las oportunidades
-        oportunidades = await db.oportunidades_placsp.find(
-            {},
-            {"_id": 0}
-        ).to_list(10000)
-
-        print(f"📊 Encontradas {len(oportunidades)} oportunidades para analizar\n")
-
-        if not oportunidades:
-            print("⚠️  No hay oportunidades en la base de datos")
-            return
-
-        # Contadores
+        # Índice para las búsquedas por oportunidad_id del resto del backend (no-op si ya
+        # existe); en dry run no se toca la colección
+        if not dry_run:
+            await db.oportunidades_placsp.create_index("oportunidad_id")
+            # Índice compuesto para los listados por tipo ordenados por score y para el
+            # recuento por tipo de abajo (que ordena por tipo_srs para poder usarlo)
+            await db.oportunidades_placsp.create_index([("tipo_srs", 1), ("score", -1)])
+
+        # Recorrer el cursor en streaming y procesar por lotes: la memoria queda acotada
+        # a BATCH_SIZE documentos sea cual sea el tamaño de la colección
+        total = 0
         cambios = []
         sin_cambios = 0
         errores = 0
 
-        # Procesar cada oportunidad
-        for opp in oportunidades:
-            try:
-                oportunidad_id = opp.get('oportunidad_id', 'N/A')
-                objeto = opp.get('objeto', '')
-                cpv = opp.get('cpv', '')
-                tipo_actual = opp.get('tipo_srs', '')
-                fecha_adj = opp.get('fecha_adjudicacion', '')
-
-                # Calcular días restantes si hay fecha de fin
-                dias_restantes = opp.get('dias_restantes')
-
-                # Extraer keywords con el algoritmo actualizado
-                keywords = extraer_keywords(objeto)
-
-                # Convertir fecha a string si es datetime
-                if isinstance(fecha_adj, datetime):
-                    fecha_adj_str = fecha_adj.strftime('%Y-%m-%d')
-                else:
-                    fecha_adj_str = str(fecha_adj)[:10] if fecha_adj else ''
-
-                # Calcular nuevo dolor/clasificación
-                dolor = calcular_dolor(
-                    objeto=objeto,
-                    fecha_adjudicacion=fecha_adj_str,
-                    duracion_dias=dias_restantes,
-                    cpv=cpv,
-                    keywords=keywords
-                )
-
-                nuevo_tipo = dolor.tipo_oportunidad.value
-                nuevas_keywords = list(keywords.keys())
-                nuevos_indicadores = dolor.indicadores_urgencia
-                nuevo_score = dolor.score_dolor
-
-                # Comparar con el tipo actual
-                if tipo_actual != nuevo_tipo:
-                    cambio = {
-                        'oportunidad_id': oportunidad_id,
-                        'expediente': opp.get('expediente', 'N/A'),
-                        'objeto': objeto[:80] + '...' if len(objeto) > 80 else objeto,
-                        'tipo_anterior': tipo_actual,
-                        'tipo_nuevo': nuevo_tipo,
-                        'keywords': nuevas_keywords[:5],
-                        'score_anterior': opp.get('score', 0),
-                        'score_nuevo': nuevo_score,
-                    }
-                    cambios.append(cambio)
-
-                    # Aplicar cambio si no es dry run
-                    if not dry_run:
-                        await db.oportunidades_placsp.update_one(
-                            {"oportunidad_id": oportunidad_id},
-                            {"$set": {
-                                "tipo_srs": nuevo_tipo,
-                                "keywords": nuevas_keywords,
-                                "indicadores_dolor": nuevos_indicadores,
-                                "score": nuevo_score,
-                            }}
-                        )
-                else:
-                    sin_cambios += 1
-
-            except Exception as e:
-                errores += 1
-                print(f"❌ Error procesando {opp.get('oportunidad_id', 'N/A')}: {e}")
+        # Solo los campos que usa la reclasificación (_id incluido: se actualiza
+        # por el índice primario)
+        cursor = db.oportunidades_placsp.find(
+            _filtro_candidatos(desde), PROYECCION, batch_size=BATCH_SIZE
+        )
+        lote = []
+
+        # forkserver: a estas alturas Motor/pymongo ya tienen hilos (monitores, executor)
+        # y hacer fork de un proceso con hilos puede dejar un worker bloqueado en un lock
+        with ProcessPoolExecutor(mp_context=multiprocessing.get_context("forkserver")) as pool:
+            async for opp in cursor:
+                lote.append(opp)
+                if len(lote) >= BATCH_SIZE:
+                    ok, ko = await _procesar_lote(db, pool, lote, cambios, dry_run)
+                    total += len(lote)
+                    sin_cambios += ok
+                    errores += ko
+                    lote = []
+
+            if lote:
+                ok, ko = await _procesar_lote(db, pool, lote, cambios, dry_run)
+                total += len(lote)
+                sin_cambios += ok
+                errores += ko
+
+        print(f"📊 Analizadas {total} oportunidades\n")
+
+        if not total:
+            print("⚠️  No hay oportunidades en la base de datos")
+            return
 
         # Mostrar resultados
         print("=" * 70)
         print("📋 RESUMEN DE RECLASIFICACIÓN")
         print("=" * 70)
-        print(f"   Total oportunidades: {len(oportunidades)}")
+        print(f"   Total oportunidades: {total}")
         print(f"   ✅ Sin cambios: {sin_cambios}")
         print(f"   🔄 Con cambios: {len(cambios)}")
         print(f"   ❌ Errores: {errores}")
         print()
 
-        if cambios:
-            print("=" * 70)
-            print("🔄 DETALLE DE CAMBIOS" + (" (NO APLICADOS - DRY RUN)" if dry_run else " (APLICADOS)"))
-            print("=" * 70)
+        if json_out:
+            # Salida para máquinas: una línea JSON por cambio, sin el detalle decorado
+            # (sin cambios queda vacía)
+            with open(json_out, "w", encoding="utf-8") as f:
+                for c in cambios:
+                    f.write(json.dumps(c, ensure_ascii=False, default=str))
+                    f.write("\n")
+            print(f"💾 {len(cambios)} cambios escritos en {json_out}\n")
+        elif cambios:
+            # Informe de cambios montado en memoria y volcado con una sola escritura
+            buf = io.StringIO()
+            buf.write("=" * 70 + "\n")
+            buf.write("🔄 DETALLE DE CAMBIOS" + (" (NO APLICADOS - DRY RUN)" if dry_run else " (APLICADOS)") + "\n")
+            buf.write("=" * 70 + "\n")
 
             for i, c in enumerate(cambios, 1):
-                print(f"""
+                buf.write(f"""
 ┌─ [{i}] {c['expediente']} ─────────────────────────────────
 │ Objeto: {c['objeto']}
 │
@@ -171,27 +364,41 @@ Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 │
 │ Score: {c['score_anterior']} → {c['score_nuevo']}
 │ Keywords: {', '.join(c['keywords']) if c['keywords'] else 'ninguna'}
-└────────────────────────────────────────────────────────────""")
+└────────────────────────────────────────────────────────────
+""")
 
-            print()
+            buf.write("\n")
 
-        # Resumen por tipo
-        if cambios:
-            print("=" * 70)
-            print("📊 CAMBIOS POR TIPO")
-            print("=" * 70)
+            # Resumen por tipo
+            buf.write("=" * 70 + "\n")
+            buf.write("📊 CAMBIOS POR TIPO\n")
+            buf.write("=" * 70 + "\n")
 
             # Contar cambios por tipo nuevo
-            por_tipo = {}
-            for c in cambios:
-                tipo = c['tipo_nuevo']
-                if tipo not in por_tipo:
-                    por_tipo[tipo] = 0
-                por_tipo[tipo] += 1
-
-            for tipo, count in sorted(por_tipo.items(), key=lambda x: x[1], reverse=True):
-                print(f"   {tipo}: {count}")
-            print()
+            por_tipo = Counter(c['tipo_nuevo'] for c in cambios)
+
+            for tipo, count in por_tipo.most_common():
+                buf.write(f"   {tipo}: {count}\n")
+            buf.write("\n")
+
+            sys.stdout.write(buf.getvalue())
+            sys.stdout.flush()
+
+        # Distribución total por tipo calculada en MongoDB: O(tipos distintos) en
+        # la respuesta, sin traer los documentos. El $sort inicial por tipo_srs deja
+        # al planificador recorrer el índice (tipo_srs, score) en vez de un COLLSCAN;
+        # sin hint, para no fallar si el índice no existe (p.ej. tras un dry run)
+        distribucion = db.oportunidades_placsp.aggregate([
+            {"$sort": {"tipo_srs": 1}},
+            {"$group": {"_id": "$tipo_srs", "n": {"$sum": 1}}},
+            {"$sort": {"n": -1}},
+        ])
+        print("=" * 70)
+        print("🗂️  DISTRIBUCIÓN POR TIPO EN BASE DE DATOS")
+        print("=" * 70)
+        async for fila in distribucion:
+            print(f"   {fila['_id'] or 'Sin tipo'}: {fila['n']}")
+        print()
 
         if dry_run and cambios:
             print("=" * 70)
@@ -216,7 +423,28 @@ def main():
         print(__doc__)
         return
 
-    asyncio.run(reclasificar_oportunidades(dry_run=dry_run))
+    desde = None
+    if '--desde' in sys.argv:
+        idx = sys.argv.index('--desde')
+        if idx + 1 >= len(sys.argv):
+            print("❌ Error: --desde requiere una fecha YYYY-MM-DD")
+            sys.exit(1)
+        # Se compara como texto con fechas ISO en Mongo: solo vale YYYY-MM-DD exacto
+        try:
+            desde = date.fromisoformat(sys.argv[idx + 1]).isoformat()
+        except ValueError:
+            print(f"❌ Error: --desde requiere una fecha YYYY-MM-DD (recibido: {sys.argv[idx + 1]!r})")
+            sys.exit(1)
+
+    json_out = None
+    if '--json-out' in sys.argv:
+        idx = sys.argv.index('--json-out')
+        if idx + 1 >= len(sys.argv):
+            print("❌ Error: --json-out requiere una ruta de fichero")
+            sys.exit(1)
+        json_out = sys.argv[idx + 1]
+
+    asyncio.run(reclasificar_oportunidades(dry_run=dry_run, desde=desde, json_out=json_out))
 
 
 if __name__ == "__main__":
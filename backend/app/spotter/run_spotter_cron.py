@@ -11,21 +11,33 @@ Mejoras v2.1:
 """
 import sys
 import os
-import json
+import re
+import ssl
+import sqlite3
+import time
+from contextlib import closing
+from functools import lru_cache
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 import logging
+from dataclasses import dataclass
 from datetime import datetime
+from typing import List, Optional
 from pathlib import Path
 
 # Configurar logging ANTES de cualquier import del proyecto
 LOG_DIR = os.getenv("LOG_DIR", "/app/logs")
 os.makedirs(LOG_DIR, exist_ok=True)
 
+# Instante de la ejecución, tomado una sola vez: nombre del log, cabecera y fecha_deteccion
+INICIO_EJECUCION = datetime.now()
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
-        logging.FileHandler(os.path.join(LOG_DIR, f"spotter_{datetime.now().strftime('%Y%m%d')}.log")),
+        logging.FileHandler(os.path.join(LOG_DIR, f"spotter_{INICIO_EJECUCION.strftime('%Y%m%d')}.log")),
         logging.StreamHandler(sys.stdout)
     ]
 )
@@ -34,9 +46,11 @@ logger = logging.getLogger(__name__)
 sys.path.insert(0, '/app')
 
 from app.spotter.spotter_srs import (
+    FEED_CHUNK,
     procesar_feed, 
-    generar_json_crm,
-    NivelDolor
+    generar_dict_crm,
+    NivelDolor,
+    TipoOportunidad
 )
 
 # Configuración con soporte para variables de entorno
@@ -58,7 +72,7 @@ if not CERT_DIR:
     for path in possible_paths:
         if os.path.exists(path):
             CERT_DIR = path
-            logger.info(f"Auto-detected certificate directory: {CERT_DIR}")
+            logger.info("Auto-detected certificate directory: %s", CERT_DIR)
             break
     
     if not CERT_DIR:
@@ -67,158 +81,312 @@ if not CERT_DIR:
 CLIENT_CERT = os.path.join(CERT_DIR, "client_cert.pem")
 CLIENT_KEY = os.path.join(CERT_DIR, "client_key_nopass.pem")
 
+# Expedientes ya enviados al CRM en ciclos anteriores (el CRM los descartaría como duplicados)
+SEEN_DB = os.getenv("SPOTTER_SEEN_DB", os.path.join(LOG_DIR, "seen.db"))
+_SQLITE_MAX_PARAMS = 900  # por debajo del límite de parámetros por consulta de SQLite
+
+
+class _SSLContextAdapter(HTTPAdapter):
+    """HTTPAdapter que usa un SSLContext ya construido para todas sus conexiones"""
+
+    def __init__(self, ssl_context: ssl.SSLContext, **kwargs):
+        self._ssl_context = ssl_context
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["ssl_context"] = self._ssl_context
+        return super().init_poolmanager(*args, **kwargs)
+
+
+def _crear_contexto_tls():
+    """
+    SSLContext con el certificado cliente cargado una sola vez por proceso
+    (el PEM y la clave privada no se vuelven a leer ni parsear en cada conexión).
+    None si los ficheros no se pueden cargar: validate_certificates() lo reporta.
+    """
+    try:
+        ctx = ssl.create_default_context()
+        ctx.load_cert_chain(CLIENT_CERT, CLIENT_KEY)
+        return ctx
+    except (OSError, ssl.SSLError) as e:
+        logger.warning("No se pudo precargar el certificado cliente: %s", e)
+        return None
+
+
+# Sesión HTTP única para PLACSP y el CRM: conexiones keep-alive reutilizadas y
+# el certificado cliente configurado una sola vez (sin handshake TCP/TLS por petición)
+_SESSION = requests.Session()
+_TLS_CTX = _crear_contexto_tls()
+if _TLS_CTX is not None:
+    _SESSION.mount("https://", _SSLContextAdapter(_TLS_CTX, pool_connections=2, pool_maxsize=10))
+else:
+    _SESSION.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=10))
+    _SESSION.cert = (CLIENT_CERT, CLIENT_KEY)
+_SESSION.mount("http://", HTTPAdapter(pool_connections=2, pool_maxsize=10))
+_SESSION.headers["Accept-Encoding"] = "gzip, deflate"
+
+_certificados_validados = False
+
 def validate_certificates():
     """Validar que los certificados existen antes de ejecutar."""
+    global _certificados_validados
+    if _certificados_validados:
+        return True
+
     logger.info("Validating SSL certificates...")
-    logger.info(f"Certificate directory: {CERT_DIR}")
-    logger.info(f"Certificate file: {CLIENT_CERT}")
-    logger.info(f"Key file: {CLIENT_KEY}")
+    logger.info("Certificate directory: %s", CERT_DIR)
+    logger.info("Certificate file: %s", CLIENT_CERT)
+    logger.info("Key file: %s", CLIENT_KEY)
+
+    # El SSLContext ya leyó y parseó certificado y clave al importar: existen y son
+    # legibles, sin más stat/access. Las comprobaciones de abajo solo diagnostican el fallo.
+    if _TLS_CTX is not None:
+        _certificados_validados = True
+        logger.info("✅ SSL certificates validated successfully")
+        return True
     
     if not os.path.exists(CERT_DIR):
-        logger.error(f"❌ Certificate directory does not exist: {CERT_DIR}")
+        logger.error("❌ Certificate directory does not exist: %s", CERT_DIR)
         logger.error("Please ensure certificates are mounted correctly in Docker.")
         return False
     
     if not os.path.exists(CLIENT_CERT):
-        logger.error(f"❌ Certificate file not found: {CLIENT_CERT}")
+        logger.error("❌ Certificate file not found: %s", CLIENT_CERT)
         logger.error("Available files in cert directory:")
         try:
             for f in os.listdir(CERT_DIR):
-                logger.error(f"  - {f}")
+                logger.error("  - %s", f)
         except Exception as e:
-            logger.error(f"  Could not list directory: {e}")
+            logger.error("  Could not list directory: %s", e)
         return False
     
     if not os.path.exists(CLIENT_KEY):
-        logger.error(f"❌ Private key file not found: {CLIENT_KEY}")
+        logger.error("❌ Private key file not found: %s", CLIENT_KEY)
         return False
     
     # Verificar permisos de lectura
     if not os.access(CLIENT_CERT, os.R_OK):
-        logger.error(f"❌ Cannot read certificate file: {CLIENT_CERT}")
+        logger.error("❌ Cannot read certificate file: %s", CLIENT_CERT)
         return False
     
     if not os.access(CLIENT_KEY, os.R_OK):
-        logger.error(f"❌ Cannot read key file: {CLIENT_KEY}")
+        logger.error("❌ Cannot read key file: %s", CLIENT_KEY)
         return False
     
+    _certificados_validados = True
     logger.info("✅ SSL certificates validated successfully")
     return True
 
 def fetch_placsp_feed():
-    """Descargar feed PLACSP usando certificados SSL."""
+    """
+    Abrir la descarga del feed PLACSP usando certificados SSL.
+
+    Devuelve la respuesta en streaming (cuerpo aún sin leer) para que el parseo
+    del XML avance a la vez que llegan los datos; ver iter_feed().
+    """
     logger.info("Descargando feed Atom de PLACSP con certificado...")
-    logger.info(f"URL: {PLACSP_FEED_URL}")
-    logger.info(f"Using certificate: {CLIENT_CERT}")
+    logger.info("URL: %s", PLACSP_FEED_URL)
+    logger.info("Using certificate: %s", CLIENT_CERT)
     
     try:
-        response = requests.get(
+        response = _SESSION.get(
             PLACSP_FEED_URL,
-            cert=(CLIENT_CERT, CLIENT_KEY),
             timeout=120,
-            verify=True
+            verify=True,
+            stream=True
         )
         response.raise_for_status()
-        logger.info(f"✅ Feed descargado: {len(response.text)} bytes")
-        
-        # Verificar que el feed no esté vacío
-        if len(response.text) < 100:
-            logger.warning(f"⚠️ Feed seems too small: {len(response.text)} bytes")
-            logger.warning(f"Response preview: {response.text[:200]}")
-        
-        return response.text
+        return response
     except requests.exceptions.SSLError as e:
-        logger.error(f"❌ SSL Error: {e}")
+        logger.error("❌ SSL Error: %s", e)
         logger.error("This usually means:")
         logger.error("  1. Certificate is invalid or expired")
         logger.error("  2. Certificate doesn't match the private key")
         logger.error("  3. Certificate is not authorized for this feed")
         return None
     except requests.exceptions.HTTPError as e:
-        logger.error(f"❌ HTTP Error {e.response.status_code}: {e}")
-        logger.error(f"Response body: {e.response.text[:500]}")
+        logger.error("❌ HTTP Error %s: %s", e.response.status_code, e)
+        logger.error("Response body: %s", e.response.text[:500])
         return None
     except requests.exceptions.ConnectionError as e:
-        logger.error(f"❌ Connection Error: {e}")
+        logger.error("❌ Connection Error: %s", e)
         return None
     except requests.exceptions.Timeout:
         logger.error("❌ Request timed out after 120 seconds")
         return None
     except Exception as e:
-        logger.error(f"❌ ERROR descargando feed: {e}")
+        logger.error("❌ ERROR descargando feed: %s", e)
         logger.exception("Full traceback:")
         return None
 
-def transform_to_crm_format(json_str):
-    data = json.loads(json_str)
-    crm_oportunidades = []
-    for op in data.get("oportunidades", []):
-        tipo_raw = op["analisis"]["tipo_oportunidad"]
-        tipo_srs = "IT / Soporte tecnico"
-        if "Cableado" in tipo_raw:
-            tipo_srs = "Telecomunicaciones"
-        elif "Ciberseguridad" in tipo_raw or "ENS" in tipo_raw:
-            tipo_srs = "Consultoria ENS"
-        elif "Comunicaciones" in tipo_raw:
-            tipo_srs = "Telecomunicaciones"
-        elif "Dron" in tipo_raw:
-            tipo_srs = "Drones / Inspeccion"
-        
-        indicadores = []
-        nivel = op["analisis"]["nivel_dolor"]
-        if nivel in ["CRITICO", "ALTO"]:
-            indicadores.append(f"Urgencia: {nivel}")
-        
-        crm_op = {
-            "expediente": op["contrato"]["expediente"],
-            "adjudicatario": op["empresa"],
-            "nif": op["nif"] or "",
-            "importe": op["contrato"]["importe"],
-            "objeto": op["contrato"]["objeto"],
-            "cpv": op["contrato"]["cpv"] or "",
-            "score": op["analisis"]["score"],
-            "tipo_srs": tipo_srs,
-            "keywords": op["analisis"]["keywords"],
-            "indicadores_dolor": indicadores,
-            "fecha_adjudicacion": op["contrato"]["fecha_adjudicacion"],
-            "fecha_fin_contrato": None,
-            "dias_restantes": op["analisis"]["dias_restantes"],
-            "url_licitacion": op["documentacion"]["url_licitacion"],
-            "url_pliego": op["documentacion"]["url_pliego_tecnico"],
-            "organo_contratacion": op["contrato"]["organo"] or "",
-            "es_pyme": op["es_pyme"],
-            "convertido_lead": False,
-            "fecha_deteccion": datetime.now().isoformat()
-        }
-        crm_oportunidades.append(crm_op)
-    return {"oportunidades": crm_oportunidades}
+def iter_feed(response):
+    """
+    Trozos del feed (bytes tal cual, descomprimidos) según llegan de la red.
+    El parser XML toma la codificación de la declaración: sin detección de
+    charset ni decodificación del feed completo.
+    """
+    total = 0
+    for trozo in response.iter_content(chunk_size=FEED_CHUNK):
+        total += len(trozo)
+        yield trozo
+    logger.info("✅ Feed descargado: %d bytes", total)
+
+    # Verificar que el feed no esté vacío
+    if total < 100:
+        logger.warning("⚠️ Feed seems too small: %d bytes", total)
+
+# Tipo de oportunidad SpotterSRS -> tipo_srs del CRM (una sola búsqueda por oportunidad)
+_TIPO_RE = re.compile(r"(Cableado|Ciberseguridad|ENS|Comunicaciones|Dron)")
+_TIPO_MAP = {
+    "Cableado": "Telecomunicaciones",
+    "Ciberseguridad": "Consultoria ENS",
+    "ENS": "Consultoria ENS",
+    "Comunicaciones": "Telecomunicaciones",
+    "Dron": "Drones / Inspeccion",
+}
+_TIPO_SRS_DEFECTO = "IT / Soporte tecnico"
+
+
+@lru_cache(maxsize=64)
+def _clasificar_tipo_srs(tipo_raw: str) -> str:
+    """tipo_srs para un tipo_oportunidad (dominio pequeño: valores de TipoOportunidad)"""
+    m = _TIPO_RE.search(tipo_raw)
+    return _TIPO_MAP[m.group(1)] if m else _TIPO_SRS_DEFECTO
+
+
+# Tabla evaluada al importar para todos los TipoOportunidad: el caso normal es un
+# único dict.get; el clasificador solo corre para valores fuera del enum
+_TIPO_SRS_POR_TIPO = {t.value: _clasificar_tipo_srs(t.value) for t in TipoOportunidad}
+
+
+@dataclass(slots=True)
+class OportunidadCRM:
+    """Oportunidad en el formato del CRM (orjson serializa los dataclasses de forma nativa)"""
+    expediente: str
+    adjudicatario: str
+    nif: str
+    importe: float
+    objeto: str
+    cpv: str
+    score: int
+    tipo_srs: str
+    keywords: List[str]
+    indicadores_dolor: List[str]
+    fecha_adjudicacion: Optional[str]
+    fecha_fin_contrato: Optional[str]
+    dias_restantes: Optional[int]
+    url_licitacion: Optional[str]
+    url_pliego: Optional[str]
+    organo_contratacion: str
+    es_pyme: Optional[bool]
+    convertido_lead: bool
+    fecha_deteccion: str
+
+
+def _build_crm(op: dict, fecha_deteccion: str) -> OportunidadCRM:
+    """Oportunidad SpotterSRS -> formato del CRM (subdicts resueltos una vez por oportunidad)"""
+    c, a, d = op["contrato"], op["analisis"], op["documentacion"]
+
+    nivel = a["nivel_dolor"]
+
+    return OportunidadCRM(
+        expediente=c["expediente"],
+        adjudicatario=op["empresa"],
+        nif=op["nif"] or "",
+        importe=c["importe"],
+        objeto=c["objeto"],
+        cpv=c["cpv"] or "",
+        score=a["score"],
+        tipo_srs=_TIPO_SRS_POR_TIPO.get(a["tipo_oportunidad"]) or _clasificar_tipo_srs(a["tipo_oportunidad"]),
+        keywords=a["keywords"],
+        indicadores_dolor=[f"Urgencia: {nivel}"] if nivel in ("CRITICO", "ALTO") else [],
+        fecha_adjudicacion=c["fecha_adjudicacion"],
+        fecha_fin_contrato=None,
+        dias_restantes=a["dias_restantes"],
+        url_licitacion=d["url_licitacion"],
+        url_pliego=d["url_pliego_tecnico"],
+        organo_contratacion=c["organo"] or "",
+        es_pyme=op["es_pyme"],
+        convertido_lead=False,
+        fecha_deteccion=fecha_deteccion
+    )
+
+
+def transform_to_crm_format(data: dict, excluir=frozenset(), fecha_deteccion: Optional[str] = None):
+    # Misma marca de detección para todo el ciclo
+    if fecha_deteccion is None:
+        fecha_deteccion = datetime.now().isoformat()
+    return {"oportunidades": [
+        _build_crm(op, fecha_deteccion)
+        for op in data.get("oportunidades", ())
+        if op["contrato"]["expediente"] not in excluir
+    ]}
+
+
+def _conectar_seen_db():
+    conn = sqlite3.connect(SEEN_DB)
+    conn.execute("CREATE TABLE IF NOT EXISTS seen(exp TEXT PRIMARY KEY, ts INTEGER)")
+    return conn
+
+
+def expedientes_enviados(expedientes: list) -> set:
+    """Subconjunto de expedientes ya enviados al CRM (una consulta IN por bloque)"""
+    enviados = set()
+    try:
+        with closing(_conectar_seen_db()) as conn:
+            for i in range(0, len(expedientes), _SQLITE_MAX_PARAMS):
+                bloque = expedientes[i:i + _SQLITE_MAX_PARAMS]
+                marcas = ",".join("?" * len(bloque))
+                enviados.update(
+                    fila[0] for fila in conn.execute(f"SELECT exp FROM seen WHERE exp IN ({marcas})", bloque)
+                )
+    except sqlite3.Error as e:
+        logger.warning("⚠️ No se pudo leer %s, se envía todo: %s", SEEN_DB, e)
+    return enviados
+
+
+def marcar_enviados(expedientes: list):
+    """Registra expedientes enviados con éxito para no reenviarlos en próximos ciclos"""
+    ts = int(time.time())
+    try:
+        with closing(_conectar_seen_db()) as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO seen VALUES(?, ?)",
+                [(exp, ts) for exp in expedientes]
+            )
+            conn.commit()
+    except sqlite3.Error as e:
+        logger.warning("⚠️ No se pudo actualizar %s: %s", SEEN_DB, e)
 
 def send_to_crm(data):
     """Enviar oportunidades al CRM vía API interna."""
-    logger.info(f"Enviando {len(data['oportunidades'])} oportunidades al CRM...")
-    logger.info(f"API URL: {CRM_API_URL}")
+    logger.info("Enviando %d oportunidades al CRM...", len(data['oportunidades']))
+    logger.info("API URL: %s", CRM_API_URL)
     
     try:
-        response = requests.post(
+        # orjson serializa en C directamente a bytes (requests no tiene que codificar),
+        # incluidos los OportunidadCRM sin pasar por dicts intermedios
+        body = orjson.dumps(data)
+        response = _SESSION.post(
             CRM_API_URL,
-            json=data,
+            data=body,
             headers={"Content-Type": "application/json"},
             timeout=30
         )
-        response.raise_for_status()
-        result = response.json()
-        logger.info(f"✅ Resultado: {result}")
+        if response.status_code >= 400:
+            logger.error("❌ HTTP Error %s: %s", response.status_code, response.reason)
+            logger.error("Response: %s", response.text[:500])
+            return None
+        # Bytes directamente a orjson: sin detección de charset ni decodificación a str
+        result = orjson.loads(response.content)
+        logger.info("✅ Resultado: %s", result)
         return result
-    except requests.exceptions.HTTPError as e:
-        logger.error(f"❌ HTTP Error {e.response.status_code}: {e}")
-        logger.error(f"Response: {e.response.text[:500]}")
-        return None
     except requests.exceptions.ConnectionError as e:
-        logger.error(f"❌ Cannot connect to CRM API at {CRM_API_URL}")
-        logger.error(f"Error: {e}")
+        logger.error("❌ Cannot connect to CRM API at %s", CRM_API_URL)
+        logger.error("Error: %s", e)
         return None
     except Exception as e:
-        logger.error(f"❌ ERROR enviando al CRM: {e}")
+        logger.error("❌ ERROR enviando al CRM: %s", e)
         logger.exception("Full traceback:")
         return None
 
@@ -227,10 +395,11 @@ def main():
     logger.info("=" * 60)
     logger.info("   SPOTTER SRS - Ejecución Cron")
     logger.info("=" * 60)
-    logger.info(f"Timestamp: {datetime.now().isoformat()}")
-    logger.info(f"Log directory: {LOG_DIR}")
-    logger.info(f"Certificate directory: {CERT_DIR}")
-    logger.info(f"CRM API URL: {CRM_API_URL}")
+    run_iso = INICIO_EJECUCION.isoformat()
+    logger.info("Timestamp: %s", run_iso)
+    logger.info("Log directory: %s", LOG_DIR)
+    logger.info("Certificate directory: %s", CERT_DIR)
+    logger.info("CRM API URL: %s", CRM_API_URL)
     logger.info("=" * 60)
     
     # Validar certificados antes de continuar
@@ -239,18 +408,20 @@ def main():
         sys.exit(1)
     
     # Descargar feed
-    xml_content = fetch_placsp_feed()
-    if not xml_content:
+    response = fetch_placsp_feed()
+    if response is None:
         logger.error("❌ Abortando: no se pudo obtener el feed")
         sys.exit(1)
     
     # Procesar feed
     logger.info("Procesando feed (filtrando ADJ y RES)...")
     try:
-        adjudicaciones = procesar_feed(xml_content)
-        logger.info(f"✅ Detectadas {len(adjudicaciones)} oportunidades relevantes")
+        # Descarga y parseo solapados: cada trozo se parsea en cuanto llega
+        with response:
+            adjudicaciones = procesar_feed(iter_feed(response))
+        logger.info("✅ Detectadas %d oportunidades relevantes", len(adjudicaciones))
     except Exception as e:
-        logger.error(f"❌ ERROR procesando feed: {e}")
+        logger.error("❌ ERROR procesando feed: %s", e)
         logger.exception("Full traceback:")
         sys.exit(1)
     
@@ -260,16 +431,31 @@ def main():
     
     # Transformar y enviar al CRM
     try:
-        json_str = generar_json_crm(adjudicaciones)
-        crm_data = transform_to_crm_format(json_str)
+        # Estructura en memoria directamente: sin json.dumps + json.loads intermedio
+        crm_dict = generar_dict_crm(adjudicaciones)
+
+        # Descartar en cliente lo ya enviado en ciclos anteriores
+        ya_enviados = expedientes_enviados(
+            [op["contrato"]["expediente"] for op in crm_dict["oportunidades"]]
+        )
+        crm_data = transform_to_crm_format(crm_dict, excluir=ya_enviados, fecha_deteccion=run_iso)
+        if ya_enviados:
+            logger.info("ℹ️  %d oportunidades ya enviadas en ciclos anteriores", len(ya_enviados))
+
+        if not crm_data["oportunidades"]:
+            logger.info("ℹ️  No hay oportunidades nuevas que enviar al CRM")
+            logger.info("✅ Ejecución completada exitosamente")
+            return
+
         result = send_to_crm(crm_data)
         
         if result:
-            logger.info(f"✅ Importadas: {result.get('imported', 0)}, Duplicadas: {result.get('duplicates', 0)}")
+            marcar_enviados([op.expediente for op in crm_data["oportunidades"]])
+            logger.info("✅ Importadas: %s, Duplicadas: %s", result.get('imported', 0), result.get('duplicates', 0))
         else:
             logger.warning("⚠️ No se pudo enviar al CRM, pero el proceso continuó")
     except Exception as e:
-        logger.error(f"❌ ERROR en transformación/envío: {e}")
+        logger.error("❌ ERROR en transformación/envío: %s", e)
         logger.exception("Full traceback:")
         sys.exit(1)
     
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Caché de extracciones IA - SpotterSRS
+
+Guarda en disco el JSON devuelto por la IA para un pliego, direccionado por
+contenido: SHA-256(versión y huella del texto del prompt, modelo, documento original). Re-analizar el
+mismo pliego (reintentos, re-ejecuciones, duplicados) no vuelve a llamar a la IA.
+
+La clave sale de los bytes del documento descargado (PDF/HTML), no del texto
+extraído: el OCR no es determinista y el mismo PDF podría dar textos distintos.
+
+Directorio configurable con SPOTTER_CACHE_DIR (por defecto backend/cache/analisis_ia).
+"""
+
+import os
+import hashlib
+import logging
+from typing import Optional, Dict
+
+import orjson
+
+from app.spotter.prompts import PROMPT_VERSION, PROMPT_HUELLA
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.getenv(
+    "SPOTTER_CACHE_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "..", "cache", "analisis_ia")
+)
+
+
+def _con_longitud(dato: bytes) -> bytes:
+    """Prefija la longitud (8 bytes) para que campos concatenados no colisionen"""
+    return len(dato).to_bytes(8, "little") + dato
+
+
+def hash_documento(datos: bytes) -> str:
+    """Huella SHA-256 (con prefijo de longitud) de un documento ya en memoria"""
+    h = hashlib.sha256()
+    h.update(len(datos).to_bytes(8, "little"))
+    h.update(datos)
+    return h.hexdigest()
+
+
+def cache_key_documento(model: str, hash_doc: str) -> str:
+    """Clave de caché para un documento (hash_documento) y un modelo"""
+    h = hashlib.sha256()
+    h.update(_con_longitud(PROMPT_VERSION.encode()))
+    h.update(_con_longitud(PROMPT_HUELLA.encode()))
+    h.update(_con_longitud(model.encode()))
+    h.update(_con_longitud(hash_doc.encode()))
+    return h.hexdigest()
+
+
+def _ruta(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+
+def leer_cache(key: str) -> Optional[Dict]:
+    """Devuelve el resultado IA cacheado o None si no existe / no es válido"""
+    try:
+        with open(_ruta(key), "rb") as f:
+            data = orjson.loads(f.read())
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Entrada de caché corrupta {key}: {e}")
+        return None
+
+    return data if isinstance(data, dict) else None
+
+
+def guardar_cache(key: str, data: Dict):
+    """Guarda el resultado IA (escritura atómica: temporal + rename)"""
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        ruta = _ruta(key)
+        tmp = f"{ruta}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(orjson.dumps(data))
+        os.replace(tmp, ruta)
+    except Exception as e:
+        logger.warning(f"No se pudo guardar en caché {key}: {e}")
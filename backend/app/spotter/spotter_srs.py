@@ -25,26 +25,56 @@ Versión: 1.0
 Fecha: Enero 2026
 """
 
+import heapq
 import requests
 import xml.etree.ElementTree as ET
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, BinaryIO, Tuple
 import re
-import json
-from enum import Enum
+import sys
+import orjson
+from enum import Enum, IntEnum
+from functools import lru_cache
+from operator import itemgetter
+from types import MappingProxyType
+
+# Aho-Corasick (C) opcional para buscar todas las keywords en una sola pasada
+AHOCORASICK_AVAILABLE = False
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    pass
 
 # ============================================================================
 # CONFIGURACIÓN
 # ============================================================================
 
-class NivelDolor(Enum):
-    """Clasificación del nivel de urgencia/dolor del adjudicatario"""
-    CRITICO = "🔴 CRÍTICO"      # < 30 días para ejecutar
-    ALTO = "🟠 ALTO"            # 30-60 días
-    MEDIO = "🟡 MEDIO"          # 60-90 días
-    BAJO = "🟢 BAJO"            # > 90 días
-    DESCONOCIDO = "⚪ SIN FECHA"
+class NivelDolor(IntEnum):
+    """
+    Clasificación del nivel de urgencia/dolor del adjudicatario.
+    Entero (mayor = más urgente): ordenar y comparar niveles es comparar ints.
+    """
+    CRITICO = 4                 # < 30 días para ejecutar
+    ALTO = 3                    # 30-60 días
+    MEDIO = 2                   # 60-90 días
+    BAJO = 1                    # > 90 días
+    DESCONOCIDO = 0
+
+    @property
+    def etiqueta(self) -> str:
+        """Texto para informes ("🔴 CRÍTICO", ...)"""
+        return _ETIQUETAS_NIVEL_DOLOR[self]
+
+
+# Etiquetas de NivelDolor indexadas por su valor
+_ETIQUETAS_NIVEL_DOLOR = ("⚪ SIN FECHA", "🟢 BAJO", "🟡 MEDIO", "🟠 ALTO", "🔴 CRÍTICO")
+
+# Niveles que piden contacto inmediato (prioridad URGENTE en el CRM, ficha comercial)
+NIVELES_URGENTES = frozenset({NivelDolor.CRITICO, NivelDolor.ALTO})
 
 
 class TipoOportunidad(Enum):
@@ -643,6 +673,61 @@ CPVS_FOTOVOLTAICA = {
     "45251160": "Instalación de energía solar",
 }
 
+# Las tablas de CPVs se comparan por sus 5 primeros dígitos (división + grupo + clase).
+# Índice prefijo → (tipo_match, descripción) construido una vez al importar: clasificar
+# un CPV es una búsqueda en dict en vez de recorrer las tablas. Ante prefijos repetidos
+# gana la primera tabla/código, igual que el recorrido en orden de clasificar_cpv.
+LONGITUD_PREFIJO_CPV = 5
+
+
+def _indexar_cpvs(*tablas: tuple) -> MappingProxyType:
+    indice = {}
+    for tipo_match, tabla in tablas:
+        for code, desc in tabla.items():
+            indice.setdefault(code[:LONGITUD_PREFIJO_CPV], (tipo_match, desc))
+    return MappingProxyType(indice)
+
+
+# Tablas de solo lectura: el índice no se actualizaría si se modificaran en caliente
+CPVS_DIGITALIZACION = MappingProxyType(CPVS_DIGITALIZACION)
+CPVS_CABLEADO = MappingProxyType(CPVS_CABLEADO)
+CPVS_AUDIOVISUAL_RIESGO = MappingProxyType(CPVS_AUDIOVISUAL_RIESGO)
+CPVS_OBRA_RIESGO = MappingProxyType(CPVS_OBRA_RIESGO)
+CPVS_FOTOVOLTAICA = MappingProxyType(CPVS_FOTOVOLTAICA)
+
+CPV_PREFIX_INDEX = _indexar_cpvs(
+    ("CPV_IT", CPVS_DIGITALIZACION),
+    ("CPV_CABLEADO", CPVS_CABLEADO),
+    ("CPV_AUDIOVISUAL", CPVS_AUDIOVISUAL_RIESGO),
+    ("CPV_OBRA", CPVS_OBRA_RIESGO),
+)
+
+# Pertenencia de cada prefijo a las tablas, como bits: una búsqueda da todas a la vez
+# (p. ej. obra con IT embebido = FLAG_CPV_OBRA y FLAG_CPV_IT | FLAG_CPV_CABLEADO)
+FLAG_CPV_IT = 1
+FLAG_CPV_CABLEADO = 2
+FLAG_CPV_AUDIOVISUAL = 4
+FLAG_CPV_OBRA = 8
+FLAG_CPV_FOTOVOLTAICA = 16
+
+
+def _flags_cpvs(*tablas: tuple) -> MappingProxyType:
+    flags = {}
+    for flag, tabla in tablas:
+        for code in tabla:
+            prefijo = code[:LONGITUD_PREFIJO_CPV]
+            flags[prefijo] = flags.get(prefijo, 0) | flag
+    return MappingProxyType(flags)
+
+
+CPV_FLAGS = _flags_cpvs(
+    (FLAG_CPV_IT, CPVS_DIGITALIZACION),
+    (FLAG_CPV_CABLEADO, CPVS_CABLEADO),
+    (FLAG_CPV_AUDIOVISUAL, CPVS_AUDIOVISUAL_RIESGO),
+    (FLAG_CPV_OBRA, CPVS_OBRA_RIESGO),
+    (FLAG_CPV_FOTOVOLTAICA, CPVS_FOTOVOLTAICA),
+)
+
 # Indicadores de plazos cortos (DOLOR ALTO)
 KEYWORDS_URGENCIA = [
     "urgente", "urgencia", "inmediato", "inmediata",
@@ -671,12 +756,137 @@ KEYWORDS_PALABRA_COMPLETA = {
     "web",      # Web
 }
 
+# ═══════════════════════════════════════════════════════════════
+# KEYWORDS DE CLASIFICACIÓN POR PILAR (tipo de oportunidad en calcular_dolor)
+# ═══════════════════════════════════════════════════════════════
+
+# PILAR 6: Fotovoltaica / Energía (NUEVO - alta prioridad)
+KW_FOTOVOLTAICA = ["fotovoltaica", "fotovoltaico", "paneles solares", "placas solares",
+                   "autoconsumo", "solar", "módulos fotovoltaicos", "modulos fotovoltaicos",
+                   "inversor solar", "kwp", "mwp", "cubierta solar", "planta fotovoltaica",
+                   "marquesina fotovoltaica", "pérgola fotovoltaica", "pergola fotovoltaica"]
+
+# PILAR 1: Field Services / Soporte Onsite
+KW_SOPORTE = ["soporte técnico", "soporte tecnico", "helpdesk", "help desk",
+              "microinformática", "microinformatica", "atención al usuario",
+              "atencion al usuario", "service desk", "mantenimiento informático",
+              "mantenimiento informatico", "soporte a usuarios", "soporte de usuarios",
+              "soporte onsite", "soporte on-site", "field service", "smart hands",
+              "wintel", "soporte nivel", "soporte n1", "soporte n2"]
+
+# PILAR 1: Cableado e Infraestructura Física
+KW_CABLEADO = ["cableado", "fibra", "red de datos", "cat6", "cat6a",
+               "puntos de red", "tomas de datos", "rack", "patch panel",
+               "cableado estructurado", "fibra óptica", "fibra optica",
+               "rackeo", "instalación de hardware", "certificación de red"]
+
+# PILAR 1: CPD / Data Center (cpd requiere palabra completa)
+KW_CPD = ["datacenter", "data center", "centro de datos", "cpd", "sala técnica",
+          "montaje de servidores", "desmontaje", "servidor", "servidores"]
+
+# PILAR 2: Cloud & Virtualización (aws, gcp requieren palabra completa)
+KW_CLOUD = ["vmware", "vsphere", "vcenter", "esxi", "vsan", "hyper-v", "proxmox",
+            "azure", "aws", "google cloud", "gcp", "migración cloud", "cloud híbrido",
+            "virtualización", "virtualizacion"]
+
+# PILAR 3: Ciberseguridad / ENS (ens, soc requieren palabra completa)
+KW_CIBER = ["ciberseguridad", "seguridad informática", "seguridad informatica",
+            "ens", "esquema nacional de seguridad",
+            "iso 27001", "soc 24/7", "soc", "veeam", "backup", "disaster recovery",
+            "hardening", "bastionado", "monitorización de seguridad"]
+
+# PILAR 4: Comunicaciones Unificadas
+KW_UC = ["comunicaciones unificadas", "microsoft teams", "ms teams", "zoom",
+         "google workspace", "videoconferencia", "telepresencia"]
+
+# PILAR 5: Healthcare IT (ris requiere palabra completa)
+KW_HEALTH = ["dicom", "pacs", "ris/pacs", "ris", "imagen médica", "imagen medica",
+             "healthcare", "radiología", "radiologia"]
+
+# DIFERENCIAL: Internacional
+KW_INTERNACIONAL = ["internacional", "multi-país", "multi-pais", "multinacional",
+                    "multisede", "múltiples sedes", "sedes internacionales",
+                    "latam", "latinoamérica", "latinoamerica", "worldwide"]
+
+# PILAR 7: Drones / Cartografía (LiDAR, fotogrametría, topografía aérea)
+# Keywords que indican captura/vuelo (contexto SRS)
+KW_DRONES_CAPTURA = ["vuelo", "vuelos", "dron", "drones", "rpas", "uav",
+                     "fotogrametría", "fotogrametria", "ortofoto", "ortofotos",
+                     "topografía aérea", "topografia aerea", "levantamiento aéreo",
+                     "captura aérea", "captura aerea", "escáner láser", "escaner laser"]
+# Keywords que pueden ser LiDAR de captura o LiDAR de procesamiento
+KW_LIDAR_CONTEXTO = ["lidar", "nube de puntos", "nubes de puntos", "laser escáner",
+                     "mdt", "mds", "modelo digital", "punto kilométrico"]
+# Keywords que confirman contexto de cartografía/obra (no solo datos)
+KW_CONTEXTO_CARTOGRAFIA = ["cartografía", "cartografia", "cartográfico", "cartografico",
+                           "seguimiento de obra", "control de obra", "avance de obra",
+                           "gemelo digital", "as-built", "asbuilt", "volumetría", "volumetria",
+                           "cubicación", "cubicacion", "estereoscop", "restitución", "restitucion"]
+# Keywords que indican que es solo procesamiento/almacenamiento de datos (NO es SRS drones)
+KW_SOLO_DATOS = ["espacio de datos", "data space", "almacenamiento de datos",
+                 "procesamiento de datos", "gestión de datos", "plataforma de datos",
+                 "lago de datos", "data lake", "big data", "interoperabilidad"]
+
+# Un bit por grupo: el escaneo del objeto devuelve los grupos presentes como máscara
+_GRUPO_FOTOVOLTAICA = 1 << 0
+_GRUPO_SOPORTE = 1 << 1
+_GRUPO_CABLEADO = 1 << 2
+_GRUPO_CPD = 1 << 3
+_GRUPO_CLOUD = 1 << 4
+_GRUPO_CIBER = 1 << 5
+_GRUPO_UC = 1 << 6
+_GRUPO_HEALTH = 1 << 7
+_GRUPO_INTERNACIONAL = 1 << 8
+_GRUPO_DRONES_CAPTURA = 1 << 9
+_GRUPO_LIDAR = 1 << 10
+_GRUPO_CONTEXTO_CARTOGRAFIA = 1 << 11
+_GRUPO_SOLO_DATOS = 1 << 12
+
+_GRUPOS_CLASIFICACION = (
+    (_GRUPO_FOTOVOLTAICA, KW_FOTOVOLTAICA),
+    (_GRUPO_SOPORTE, KW_SOPORTE),
+    (_GRUPO_CABLEADO, KW_CABLEADO),
+    (_GRUPO_CPD, KW_CPD),
+    (_GRUPO_CLOUD, KW_CLOUD),
+    (_GRUPO_CIBER, KW_CIBER),
+    (_GRUPO_UC, KW_UC),
+    (_GRUPO_HEALTH, KW_HEALTH),
+    (_GRUPO_INTERNACIONAL, KW_INTERNACIONAL),
+    (_GRUPO_DRONES_CAPTURA, KW_DRONES_CAPTURA),
+    (_GRUPO_LIDAR, KW_LIDAR_CONTEXTO),
+    (_GRUPO_CONTEXTO_CARTOGRAFIA, KW_CONTEXTO_CARTOGRAFIA),
+    (_GRUPO_SOLO_DATOS, KW_SOLO_DATOS),
+)
+
+# Todas las keywords de palabra completa en una sola regex: una pasada por texto
+# (las más largas primero; orden fijo, el de un set cambia entre ejecuciones)
+RE_PALABRA_COMPLETA = re.compile(
+    r'\b(' + '|'.join(
+        re.escape(kw) for kw in sorted(KEYWORDS_PALABRA_COMPLETA, key=lambda k: (-len(k), k))
+    ) + r')\b',
+    re.IGNORECASE
+)
+
+# Prefiltro de urgencia: una sola búsqueda descarta los objetos sin ninguna keyword
+_RE_URGENCIA = re.compile("|".join(re.escape(kw) for kw in KEYWORDS_URGENCIA))
+
+
+@lru_cache(maxsize=None)
+def _patron_palabra_completa(keyword: str) -> "re.Pattern":
+    """Regex de palabra completa para una keyword, compilada una sola vez"""
+    # \b marca límite de palabra (word boundary)
+    return re.compile(r'\b' + re.escape(keyword) + r'\b', re.IGNORECASE)
+
+
+# Las de KEYWORDS_PALABRA_COMPLETA, compiladas al importar (sin pasar por la caché)
+_PATRONES_PALABRA_COMPLETA = {kw: _patron_palabra_completa(kw) for kw in sorted(KEYWORDS_PALABRA_COMPLETA)}
+
 
 # ============================================================================
 # ESTRUCTURAS DE DATOS
 # ============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class PliegoInfo:
     """Información extraída de los pliegos"""
     url_pliego_tecnico: Optional[str] = None
@@ -684,7 +894,7 @@ class PliegoInfo:
     url_otros_documentos: List[str] = field(default_factory=list)
     
 
-@dataclass
+@dataclass(slots=True)
 class AnalisisDolor:
     """Análisis del dolor/urgencia del adjudicatario"""
     nivel: NivelDolor
@@ -696,7 +906,12 @@ class AnalisisDolor:
     tipo_oportunidad: TipoOportunidad
     
 
-@dataclass 
+# Tramos de importe para el bonus de score_total: bisect da el número de umbrales superados
+_UMBRALES_IMPORTE = (100000, 200000, 500000)
+_BONUS_IMPORTE = (0, 5, 10, 15)
+
+
+@dataclass(slots=True)
 class Adjudicacion:
     """Adjudicación detectada con análisis completo"""
     # Datos básicos
@@ -713,7 +928,7 @@ class Adjudicacion:
     
     # Clasificación
     tipo_match: str
-    keywords_encontradas: Dict[str, int]  # keyword -> peso
+    filas_keywords: Tuple[int, ...]  # filas de la tabla de keywords encontradas, en orden de tabla
     es_pyme: bool
     
     # Análisis de dolor
@@ -725,29 +940,40 @@ class Adjudicacion:
     # Datos para contacto
     email_organo: Optional[str] = None
     telefono_organo: Optional[str] = None
+
+    # Keywords con peso >= 5, contadas una vez al construir (bonus de score_total)
+    n_keywords_alto_valor: int = field(default=0, init=False, repr=False, compare=False)
+
+    # Score calculado (se pide varias veces: ordenación, resumen, JSON para el CRM)
+    _score_cache: Optional[int] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.n_keywords_alto_valor = sum(1 for i in self.filas_keywords if _TABLA_KEYWORDS[i][2] >= 5)
+
+    @property
+    def keywords_encontradas(self) -> Dict[str, int]:
+        """keyword -> peso; el dict se construye solo cuando se pide (informes, JSON)"""
+        return _keywords_de_filas(self.filas_keywords)
     
     def score_total(self) -> int:
         """Calcula score total de la oportunidad (0-100)"""
+        if self._score_cache is not None:
+            return self._score_cache
+
         score = self.dolor.score_dolor
         
-        # Bonus por importe
-        if self.importe > 500000:
-            score += 15
-        elif self.importe > 200000:
-            score += 10
-        elif self.importe > 100000:
-            score += 5
+        # Bonus por importe (> 100k: 5, > 200k: 10, > 500k: 15)
+        score += _BONUS_IMPORTE[bisect_left(_UMBRALES_IMPORTE, self.importe)]
             
         # Bonus si es PYME (más probable que necesite ayuda)
         if self.es_pyme:
             score += 10
             
         # Bonus por keywords de alto valor
-        for kw, peso in self.keywords_encontradas.items():
-            if peso >= 5:
-                score += 3
+        score += 3 * self.n_keywords_alto_valor
                 
-        return min(100, score)
+        self._score_cache = min(100, score)
+        return self._score_cache
 
 
 # ============================================================================
@@ -762,23 +988,96 @@ NS = {
     'cac': 'urn:dgpe:names:draft:codice:schema:xsd:CommonAggregateComponents-2',
     'cfs': 'urn:dgpe:names:draft:codice:schema:xsd:ContractFolderStatus-2',
 }
+NS = {prefijo: sys.intern(uri) for prefijo, uri in NS.items()}
+
+
+def _tag(prefijo: str, nombre: str) -> str:
+    """Nombre de tag en notación de ElementTree ({uri}nombre), construido una sola vez"""
+    return sys.intern(f"{{{NS[prefijo]}}}{nombre}")
+
+
+_ATOM_ENTRY = _tag('atom', 'entry')
+_ATOM_TITLE = _tag('atom', 'title')
+_ATOM_LINK = _tag('atom', 'link')
+
+# Estados de ContractFolderStatus que interesan (adjudicada / resuelta)
+ESTADOS_ADJUDICADOS = frozenset({"ADJ", "RES", "ADJUDICADA", "RESUELTA"})
+
+# Campos que parse_entry extrae de ContractFolderStatus (bits)
+_CAMPO_ESTADO = 1 << 0
+_CAMPO_EXPEDIENTE = 1 << 1
+_CAMPO_CPV = 1 << 2
+_CAMPO_ADJUDICATARIO = 1 << 3
+_CAMPO_IMPORTE = 1 << 4
+_CAMPO_FECHA = 1 << 5
+_CAMPO_ORGANO = 1 << 6
+_CAMPO_DURACION = 1 << 7
+_CAMPO_DOCUMENTO = 1 << 8
+_CAMPOS_ENTRY = (1 << 9) - 1
+
+# Subcadenas del tag que activan cada campo (se busca en el tag completo)
+_SUBCADENAS_CAMPO = (
+    (_CAMPO_ESTADO, ('ContractFolderStatusCode',)),
+    (_CAMPO_EXPEDIENTE, ('ContractFolderID',)),
+    (_CAMPO_CPV, ('ItemClassificationCode',)),
+    (_CAMPO_ADJUDICATARIO, ('WinningParty',)),
+    (_CAMPO_IMPORTE, ('TotalAmount', 'TaxExclusiveAmount')),
+    (_CAMPO_FECHA, ('AwardDate',)),
+    (_CAMPO_ORGANO, ('LocatedContractingParty',)),
+    (_CAMPO_DURACION, ('DurationMeasure',)),
+    (_CAMPO_DOCUMENTO, ('DocumentReference',)),
+)
+
+
+@lru_cache(maxsize=1024)
+def _campos_tag(tag: str) -> int:
+    """Bits de los campos a los que alimenta un tag; los feeds repiten pocos tags distintos"""
+    campos = 0
+    for bit, subcadenas in _SUBCADENAS_CAMPO:
+        for subcadena in subcadenas:
+            if subcadena in tag:
+                campos |= bit
+                break
+    return campos
 
 
 # ============================================================================
 # FUNCIONES DE ANÁLISIS DE DOLOR
 # ============================================================================
 
+def _parsear_fecha(fecha: str) -> datetime:
+    """
+    Fecha YYYY-MM-DD a datetime. La forma habitual va por fromisoformat (mucho más
+    rápido que strptime); lo que este no acepta decide strptime como siempre
+    (p.ej. "2025-1-5"). Lanza ValueError si no es una fecha válida.
+    """
+    if len(fecha) == 10 and fecha[4] == '-' and fecha[7] == '-' and fecha.isascii():
+        try:
+            return datetime.fromisoformat(fecha)
+        except ValueError:
+            pass
+    return datetime.strptime(fecha, "%Y-%m-%d")
+
+
 def calcular_dolor(
     objeto: str,
     fecha_adjudicacion: str,
     duracion_dias: Optional[int],
     cpv: str,
-    keywords: Dict[str, int]
+    keywords: Dict[str, int],
+    objeto_lower: Optional[str] = None,
+    ahora: Optional[datetime] = None,
+    peso_keywords: Optional[int] = None
 ) -> AnalisisDolor:
     """
     Calcula el nivel de dolor/urgencia basado en múltiples factores.
+    objeto_lower: el objeto ya en minúsculas, si el llamador lo tiene (evita repetir el lower).
+    ahora: instante de referencia para los plazos; al procesar un feed se toma uno
+    para todo el lote (por defecto, datetime.now()).
+    peso_keywords: suma de los pesos de `keywords`, si el llamador ya la tiene.
     """
-    objeto_lower = objeto.lower()
+    if objeto_lower is None:
+        objeto_lower = objeto.lower()
     indicadores = []
     score = 0
     
@@ -789,10 +1088,10 @@ def calcular_dolor(
     
     if duracion_dias and fecha_adjudicacion:
         try:
-            fecha_adj = datetime.strptime(fecha_adjudicacion, "%Y-%m-%d")
+            fecha_adj = _parsear_fecha(fecha_adjudicacion)
             fecha_fin_dt = fecha_adj + timedelta(days=duracion_dias)
             fecha_fin = fecha_fin_dt.strftime("%Y-%m-%d")
-            dias_hasta_fin = (fecha_fin_dt - datetime.now()).days
+            dias_hasta_fin = (fecha_fin_dt - (ahora or datetime.now())).days
             duracion_meses = duracion_dias // 30
             
             if dias_hasta_fin < 30:
@@ -806,17 +1105,16 @@ def calcular_dolor(
                 indicadores.append(f"Plazo moderado: {dias_hasta_fin} días")
             else:
                 score += 10
-        except:
+        except (ValueError, TypeError, OverflowError):
             pass
     
-    # 2. Keywords de urgencia en objeto
-    for kw in KEYWORDS_URGENCIA:
-        if kw in objeto_lower:
-            score += 15
-            indicadores.append(f"Urgencia detectada: '{kw}'")
+    # 2. Keywords de urgencia en objeto (una sola pasada del autómata)
+    for kw in _keywords_urgencia(objeto_lower):
+        score += 15
+        indicadores.append(f"Urgencia detectada: '{kw}'")
     
     # 3. Score por keywords técnicas
-    keyword_score = sum(keywords.values())
+    keyword_score = peso_keywords if peso_keywords is not None else sum(keywords.values())
     if keyword_score > 20:
         score += 20
         indicadores.append("Alta complejidad técnica")
@@ -827,114 +1125,23 @@ def calcular_dolor(
     # 4. Determinar tipo de oportunidad (priorizado para pilares SRS)
     cpv_base = cpv[:5] if cpv else ""
     cpv_8 = cpv[:8] if cpv else ""
-    keywords_lower = {k.lower(): v for k, v in keywords.items()}
-
-    # ═══════════════════════════════════════════════════════════════
-    # FUNCIÓN HELPER PARA DETECTAR KEYWORDS CON VALIDACIÓN
-    # ═══════════════════════════════════════════════════════════════
-    def tiene_keyword(texto: str, lista_keywords: list) -> bool:
-        """
-        Detecta si alguna keyword de la lista está en el texto.
-        Para keywords cortas (en KEYWORDS_PALABRA_COMPLETA), valida palabra completa.
-        """
-        import re
-        for kw in lista_keywords:
-            kw_lower = kw.lower()
-            if kw_lower in KEYWORDS_PALABRA_COMPLETA:
-                # Validar como palabra completa
-                pattern = r'\b' + re.escape(kw_lower) + r'\b'
-                if re.search(pattern, texto, re.IGNORECASE):
-                    return True
-            else:
-                # Búsqueda normal por subcadena
-                if kw_lower in texto:
-                    return True
-        return False
-
-    # ═══════════════════════════════════════════════════════════════
-    # DETECCIÓN POR KEYWORDS (basado en pilares del portfolio SRS)
-    # ═══════════════════════════════════════════════════════════════
-
-    # PILAR 6: Fotovoltaica / Energía (NUEVO - alta prioridad)
-    kw_fotovoltaica = ["fotovoltaica", "fotovoltaico", "paneles solares", "placas solares",
-                       "autoconsumo", "solar", "módulos fotovoltaicos", "modulos fotovoltaicos",
-                       "inversor solar", "kwp", "mwp", "cubierta solar", "planta fotovoltaica",
-                       "marquesina fotovoltaica", "pérgola fotovoltaica", "pergola fotovoltaica"]
-
-    # PILAR 1: Field Services / Soporte Onsite
-    kw_soporte = ["soporte técnico", "soporte tecnico", "helpdesk", "help desk",
-                  "microinformática", "microinformatica", "atención al usuario",
-                  "atencion al usuario", "service desk", "mantenimiento informático",
-                  "mantenimiento informatico", "soporte a usuarios", "soporte de usuarios",
-                  "soporte onsite", "soporte on-site", "field service", "smart hands",
-                  "wintel", "soporte nivel", "soporte n1", "soporte n2"]
-
-    # PILAR 1: Cableado e Infraestructura Física
-    kw_cableado = ["cableado", "fibra", "red de datos", "cat6", "cat6a",
-                   "puntos de red", "tomas de datos", "rack", "patch panel",
-                   "cableado estructurado", "fibra óptica", "fibra optica",
-                   "rackeo", "instalación de hardware", "certificación de red"]
-
-    # PILAR 1: CPD / Data Center (cpd requiere palabra completa)
-    kw_cpd = ["datacenter", "data center", "centro de datos", "cpd", "sala técnica",
-              "montaje de servidores", "desmontaje", "servidor", "servidores"]
-
-    # PILAR 2: Cloud & Virtualización (aws, gcp requieren palabra completa)
-    kw_cloud = ["vmware", "vsphere", "vcenter", "esxi", "vsan", "hyper-v", "proxmox",
-                "azure", "aws", "google cloud", "gcp", "migración cloud", "cloud híbrido",
-                "virtualización", "virtualizacion"]
-
-    # PILAR 3: Ciberseguridad / ENS (ens, soc requieren palabra completa)
-    kw_ciber = ["ciberseguridad", "seguridad informática", "seguridad informatica",
-                "ens", "esquema nacional de seguridad",
-                "iso 27001", "soc 24/7", "soc", "veeam", "backup", "disaster recovery",
-                "hardening", "bastionado", "monitorización de seguridad"]
-
-    # PILAR 4: Comunicaciones Unificadas
-    kw_uc = ["comunicaciones unificadas", "microsoft teams", "ms teams", "zoom",
-             "google workspace", "videoconferencia", "telepresencia"]
-
-    # PILAR 5: Healthcare IT (ris requiere palabra completa)
-    kw_health = ["dicom", "pacs", "ris/pacs", "ris", "imagen médica", "imagen medica",
-                 "healthcare", "radiología", "radiologia"]
-
-    # DIFERENCIAL: Internacional
-    kw_internacional = ["internacional", "multi-país", "multi-pais", "multinacional",
-                        "multisede", "múltiples sedes", "sedes internacionales",
-                        "latam", "latinoamérica", "latinoamerica", "worldwide"]
-
-    # PILAR 7: Drones / Cartografía (LiDAR, fotogrametría, topografía aérea)
-    # Keywords que indican captura/vuelo (contexto SRS)
-    kw_drones_captura = ["vuelo", "vuelos", "dron", "drones", "rpas", "uav",
-                         "fotogrametría", "fotogrametria", "ortofoto", "ortofotos",
-                         "topografía aérea", "topografia aerea", "levantamiento aéreo",
-                         "captura aérea", "captura aerea", "escáner láser", "escaner laser"]
-    # Keywords que pueden ser LiDAR de captura o LiDAR de procesamiento
-    kw_lidar_contexto = ["lidar", "nube de puntos", "nubes de puntos", "laser escáner",
-                         "mdt", "mds", "modelo digital", "punto kilométrico"]
-    # Keywords que confirman contexto de cartografía/obra (no solo datos)
-    kw_contexto_cartografia = ["cartografía", "cartografia", "cartográfico", "cartografico",
-                               "seguimiento de obra", "control de obra", "avance de obra",
-                               "gemelo digital", "as-built", "asbuilt", "volumetría", "volumetria",
-                               "cubicación", "cubicacion", "estereoscop", "restitución", "restitucion"]
-    # Keywords que indican que es solo procesamiento/almacenamiento de datos (NO es SRS drones)
-    kw_solo_datos = ["espacio de datos", "data space", "almacenamiento de datos",
-                     "procesamiento de datos", "gestión de datos", "plataforma de datos",
-                     "lago de datos", "data lake", "big data", "interoperabilidad"]
 
     # ═══════════════════════════════════════════════════════════════
     # CLASIFICACIÓN POR PRIORIDAD (usando validación de palabra completa)
     # ═══════════════════════════════════════════════════════════════
-    tiene_fotovoltaica = tiene_keyword(objeto_lower, kw_fotovoltaica)
-    tiene_soporte = tiene_keyword(objeto_lower, kw_soporte)
-    tiene_cableado = tiene_keyword(objeto_lower, kw_cableado)
-    tiene_cpd = tiene_keyword(objeto_lower, kw_cpd)
+    # Grupos de keywords presentes (misma pasada del autómata que extraer_keywords)
+    grupos = _grupos_keywords(objeto_lower)
+
+    tiene_fotovoltaica = bool(grupos & _GRUPO_FOTOVOLTAICA)
+    tiene_soporte = bool(grupos & _GRUPO_SOPORTE)
+    tiene_cableado = bool(grupos & _GRUPO_CABLEADO)
+    tiene_cpd = bool(grupos & _GRUPO_CPD)
 
     # Detección inteligente de Drones/Cartografía
-    tiene_drones_captura = tiene_keyword(objeto_lower, kw_drones_captura)
-    tiene_lidar = tiene_keyword(objeto_lower, kw_lidar_contexto)
-    tiene_contexto_cartografia = tiene_keyword(objeto_lower, kw_contexto_cartografia)
-    tiene_solo_datos = tiene_keyword(objeto_lower, kw_solo_datos)
+    tiene_drones_captura = bool(grupos & _GRUPO_DRONES_CAPTURA)
+    tiene_lidar = bool(grupos & _GRUPO_LIDAR)
+    tiene_contexto_cartografia = bool(grupos & _GRUPO_CONTEXTO_CARTOGRAFIA)
+    tiene_solo_datos = bool(grupos & _GRUPO_SOLO_DATOS)
 
     # LiDAR + contexto de vuelo/cartografía = Drones/Cartografía
     # LiDAR + contexto de datos/almacenamiento = NO es Drones (es IT)
@@ -943,14 +1150,14 @@ def calcular_dolor(
         tiene_contexto_cartografia or  # Keywords de cartografía/obra
         (tiene_lidar and not tiene_solo_datos)  # LiDAR sin contexto de "solo datos"
     )
-    tiene_cloud = tiene_keyword(objeto_lower, kw_cloud)
-    tiene_ciber = tiene_keyword(objeto_lower, kw_ciber)
-    tiene_uc = tiene_keyword(objeto_lower, kw_uc)
-    tiene_health = tiene_keyword(objeto_lower, kw_health)
-    tiene_internacional = tiene_keyword(objeto_lower, kw_internacional)
+    tiene_cloud = bool(grupos & _GRUPO_CLOUD)
+    tiene_ciber = bool(grupos & _GRUPO_CIBER)
+    tiene_uc = bool(grupos & _GRUPO_UC)
+    tiene_health = bool(grupos & _GRUPO_HEALTH)
+    tiene_internacional = bool(grupos & _GRUPO_INTERNACIONAL)
 
     # Verificar CPV de fotovoltaica
-    es_cpv_fotovoltaica = any(cpv_8.startswith(code[:5]) for code in CPVS_FOTOVOLTAICA.keys())
+    es_cpv_fotovoltaica = bool(CPV_FLAGS.get(cpv_8[:LONGITUD_PREFIJO_CPV], 0) & FLAG_CPV_FOTOVOLTAICA)
 
     # Clasificación jerárquica (fotovoltaica tiene alta prioridad)
     if tiene_fotovoltaica or es_cpv_fotovoltaica:
@@ -1024,84 +1231,199 @@ def es_palabra_completa(texto: str, keyword: str) -> bool:
     Verifica si la keyword aparece como palabra completa en el texto.
     Evita falsos positivos como "potencia" matcheando con "ens".
     """
-    import re
-    # \b marca límite de palabra (word boundary)
-    pattern = r'\b' + re.escape(keyword) + r'\b'
-    return bool(re.search(pattern, texto, re.IGNORECASE))
+    patron = _PATRONES_PALABRA_COMPLETA.get(keyword) or _patron_palabra_completa(keyword)
+    return bool(patron.search(texto))
+
+
+def _normalizar_keyword(keyword: str) -> str:
+    """Forma de comparación de una keyword (minúsculas, internada): se calcula al importar"""
+    return sys.intern(keyword.lower())
+
+
+# Tablas de keywords de solo lectura: la tabla, los índices y el autómata de abajo se
+# construyen una vez al importar y no verían cambios hechos en caliente
+KEYWORDS_DOLOR_IT = MappingProxyType(KEYWORDS_DOLOR_IT)
+KEYWORDS_DOLOR_CABLEADO = MappingProxyType(KEYWORDS_DOLOR_CABLEADO)
+KEYWORDS_AUDIOVISUAL_CON_CABLEADO = MappingProxyType(KEYWORDS_AUDIOVISUAL_CON_CABLEADO)
+KEYWORDS_FONDOS_EU = MappingProxyType(KEYWORDS_FONDOS_EU)
+KEYWORDS_INTERNACIONAL = MappingProxyType(KEYWORDS_INTERNACIONAL)
+KEYWORDS_FOTOVOLTAICA = MappingProxyType(KEYWORDS_FOTOVOLTAICA)
+
+# Todas las tablas en un único dict keyword → peso (ante repetidas gana la última tabla)
+_TODOS_KEYWORDS = MappingProxyType({
+    **KEYWORDS_DOLOR_IT,
+    **KEYWORDS_DOLOR_CABLEADO,
+    **KEYWORDS_AUDIOVISUAL_CON_CABLEADO,
+    **KEYWORDS_FONDOS_EU,
+    **KEYWORDS_INTERNACIONAL,
+    **KEYWORDS_FOTOVOLTAICA,
+})
+
+# Tabla de keywords precalculada una vez al importar: (keyword, keyword_lower, peso, palabra_completa)
+_TABLA_KEYWORDS = [
+    (kw, kw_lower, peso, kw_lower in KEYWORDS_PALABRA_COMPLETA)
+    for kw, peso in _TODOS_KEYWORDS.items()
+    for kw_lower in (_normalizar_keyword(kw),)
+]
 
 
-def extraer_keywords(objeto: str) -> Dict[str, int]:
-    """Extrae keywords con sus pesos del objeto del contrato"""
-    objeto_lower = objeto.lower()
-    encontradas = {}
+def _indexar_filas(palabra_completa: bool) -> Dict[str, tuple]:
+    """Filas de _TABLA_KEYWORDS por keyword en minúsculas (varias claves pueden compartirla)"""
+    indice: Dict[str, tuple] = {}
+    for i, (_, kw_lower, _, completa) in enumerate(_TABLA_KEYWORDS):
+        if completa == palabra_completa:
+            indice[kw_lower] = indice.get(kw_lower, ()) + (i,)
+    return indice
+
+
+_FILAS_SUBCADENA = _indexar_filas(False)
+_FILAS_COMPLETA = _indexar_filas(True)
 
-    # Buscar en todos los diccionarios de keywords
-    todos_keywords = {
-        **KEYWORDS_DOLOR_IT,
-        **KEYWORDS_DOLOR_CABLEADO,
-        **KEYWORDS_AUDIOVISUAL_CON_CABLEADO,
-        **KEYWORDS_FONDOS_EU,
-        **KEYWORDS_INTERNACIONAL,
-        **KEYWORDS_FOTOVOLTAICA,  # Añadir keywords de fotovoltaica
-    }
 
-    for kw, peso in todos_keywords.items():
-        kw_lower = kw.lower()
+def _crear_automata(palabras: Dict[str, object]):
+    """Autómata Aho-Corasick palabra → valor (None sin pyahocorasick)"""
+    if not AHOCORASICK_AVAILABLE:
+        return None
+    automata = ahocorasick.Automaton()
+    for palabra, valor in palabras.items():
+        automata.add_word(palabra, valor)
+    automata.make_automaton()
+    return automata
+
 
-        # Para keywords cortas que pueden causar falsos positivos,
-        # verificar que sea palabra completa
+def _entradas_keywords() -> Dict[str, tuple]:
+    """
+    Cada keyword (tablas de peso y grupos de clasificación) → (filas de _TABLA_KEYWORDS,
+    la propia keyword si es de palabra completa o None, máscara de grupos)
+    """
+    grupos: Dict[str, int] = {}
+    for bit, lista in _GRUPOS_CLASIFICACION:
+        for kw in lista:
+            kw_lower = _normalizar_keyword(kw)
+            grupos[kw_lower] = grupos.get(kw_lower, 0) | bit
+
+    entradas = {}
+    for kw_lower in {*_FILAS_SUBCADENA, *_FILAS_COMPLETA, *grupos}:
         if kw_lower in KEYWORDS_PALABRA_COMPLETA:
-            if es_palabra_completa(objeto_lower, kw_lower):
-                encontradas[kw] = peso
+            entradas[kw_lower] = (_FILAS_COMPLETA.get(kw_lower, ()), kw_lower, grupos.get(kw_lower, 0))
         else:
-            # Para keywords normales, búsqueda por subcadena
-            if kw_lower in objeto_lower:
-                encontradas[kw] = peso
+            entradas[kw_lower] = (_FILAS_SUBCADENA.get(kw_lower, ()), None, grupos.get(kw_lower, 0))
+    return entradas
+
+
+_ENTRADAS_KEYWORDS = _entradas_keywords()
+# Todas las keywords en un solo autómata; el límite de palabra de las cortas se valida
+# en cada coincidencia
+_AC_KEYWORDS = _crear_automata(_ENTRADAS_KEYWORDS)
+# Keywords de urgencia → posición en KEYWORDS_URGENCIA
+_AC_URGENCIA = _crear_automata({kw: i for i, kw in enumerate(KEYWORDS_URGENCIA)})
+
+
+def _keywords_urgencia(objeto_lower: str) -> List[str]:
+    """Keywords de urgencia presentes en el objeto, en el orden de KEYWORDS_URGENCIA"""
+    if _AC_URGENCIA is not None:
+        if not objeto_lower:
+            return []
+        posiciones = {i for _, i in _AC_URGENCIA.iter(objeto_lower)}
+        return [KEYWORDS_URGENCIA[i] for i in sorted(posiciones)]
+
+    # Sin autómata: el recorrido solo si el prefiltro encuentra alguna
+    if not _RE_URGENCIA.search(objeto_lower):
+        return []
+    return [kw for kw in KEYWORDS_URGENCIA if kw in objeto_lower]
+
+
+def _es_caracter_palabra(c: str) -> bool:
+    """Lo mismo que \\w en las regex de str (letras, dígitos y _): define el límite \\b"""
+    return c.isalnum() or c == "_"
+
+
+@lru_cache(maxsize=8192)
+def _escanear(objeto_lower: str) -> tuple:
+    """
+    Una sola pasada por el objeto (ya en minúsculas): (filas de _TABLA_KEYWORDS presentes
+    en orden de tabla, máscara de _GRUPOS_CLASIFICACION presentes, suma de pesos).
+    Memoizada: los objetos repetidos (textos tipo, lotes) no se vuelven a escanear.
+    Las filas van en una tupla: el resultado se comparte entre llamadas y adjudicaciones.
+    """
+    filas = set()
+    grupos = 0
+
+    if _AC_KEYWORDS is not None:
+        # Todas las apariciones, también solapadas, en una pasada lineal del autómata;
+        # las keywords cortas solo cuentan si no están pegadas a otra letra/dígito
+        ultimo = len(objeto_lower) - 1
+        coincidencias = _AC_KEYWORDS.iter(objeto_lower) if objeto_lower else ()
+        for fin, (filas_kw, completa, grupos_kw) in coincidencias:
+            if completa is not None:
+                inicio = fin - len(completa) + 1
+                if inicio > 0 and _es_caracter_palabra(objeto_lower[inicio - 1]):
+                    continue
+                if fin < ultimo and _es_caracter_palabra(objeto_lower[fin + 1]):
+                    continue
+            filas.update(filas_kw)
+            grupos |= grupos_kw
+    else:
+        # Sin autómata: palabra completa con la regex, subcadena con un `in` por keyword
+        completas = {m.lower() for m in RE_PALABRA_COMPLETA.findall(objeto_lower)}
+        for kw_lower, (filas_kw, completa, grupos_kw) in _ENTRADAS_KEYWORDS.items():
+            if (kw_lower in completas) if completa is not None else (kw_lower in objeto_lower):
+                filas.update(filas_kw)
+                grupos |= grupos_kw
+
+    # Orden de las tablas de keywords, como antes
+    peso = sum(_TABLA_KEYWORDS[i][2] for i in filas)
+    return tuple(sorted(filas)), grupos, peso
+
 
+def _filas_keywords(objeto_lower: str) -> Tuple[int, ...]:
+    """Filas de _TABLA_KEYWORDS presentes en el objeto (ya en minúsculas), en orden de tabla"""
+    return _escanear(objeto_lower)[0]
+
+
+def _grupos_keywords(objeto_lower: str) -> int:
+    """Máscara de los grupos de clasificación con alguna keyword en el objeto (ya en minúsculas)"""
+    return _escanear(objeto_lower)[1]
+
+
+def _peso_keywords(objeto_lower: str) -> int:
+    """Suma de pesos de las keywords del objeto (ya en minúsculas)"""
+    return _escanear(objeto_lower)[2]
+
+
+def _keywords_de_filas(filas) -> Dict[str, int]:
+    """keyword -> peso para unas filas de _TABLA_KEYWORDS"""
+    encontradas = {}
+    for i in filas:
+        kw, _, peso, _ = _TABLA_KEYWORDS[i]
+        encontradas[kw] = peso
     return encontradas
 
 
+def extraer_keywords(objeto: str) -> Dict[str, int]:
+    """Extrae keywords con sus pesos del objeto del contrato"""
+    return _keywords_de_filas(_filas_keywords(objeto.lower()))
+
+
 def clasificar_cpv(cpv: str) -> tuple:
     """Retorna (tipo_match, descripcion_cpv)"""
-    cpv_base = cpv[:8] if cpv else ""
-    cpv_5 = cpv[:5] if cpv else ""
-    
-    # Buscar en digitalizacion
-    for code, desc in CPVS_DIGITALIZACION.items():
-        if cpv_base.startswith(code[:5]):
-            return ("CPV_IT", desc)
-    
-    # Buscar en cableado
-    for code, desc in CPVS_CABLEADO.items():
-        if cpv_base.startswith(code[:5]):
-            return ("CPV_CABLEADO", desc)
-    
-    # Buscar en audiovisual (puede tener cableado embebido)
-    for code, desc in CPVS_AUDIOVISUAL_RIESGO.items():
-        if cpv_base.startswith(code[:5]):
-            return ("CPV_AUDIOVISUAL", desc)
-    
-    # Buscar en obra
-    for code, desc in CPVS_OBRA_RIESGO.items():
-        if cpv_base.startswith(code[:5]):
-            return ("CPV_OBRA", desc)
-    
-    return ("OTRO", "No clasificado")
+    cpv_5 = cpv[:LONGITUD_PREFIJO_CPV] if cpv else ""
+    return CPV_PREFIX_INDEX.get(cpv_5, ("OTRO", "No clasificado"))
 
 
 # ============================================================================
 # PARSING DE FEED
 # ============================================================================
 
-def parse_entry(entry: ET.Element) -> Optional[Adjudicacion]:
-    """Parsea un entry del feed ATOM de PLACSP"""
+def parse_entry(entry: ET.Element, ahora: Optional[datetime] = None) -> Optional[Adjudicacion]:
+    """Parsea un entry del feed ATOM de PLACSP (ahora: referencia de plazos, ver calcular_dolor)"""
     try:
         # Extraer título (objeto)
-        title = entry.find('{http://www.w3.org/2005/Atom}title')
+        title = entry.find(_ATOM_TITLE)
         objeto = title.text.strip() if title is not None and title.text else ""
         
         # Extraer URL
-        link = entry.find('{http://www.w3.org/2005/Atom}link')
+        link = entry.find(_ATOM_LINK)
         url = link.get('href', '') if link is not None else ""
         
         # Buscar ContractFolderStatus directamente en entry (formato PLACSP real)
@@ -1114,38 +1436,44 @@ def parse_entry(entry: ET.Element) -> Optional[Adjudicacion]:
         if cfs is None:
             return None
         
-        # Extraer estado
+        # Un solo recorrido de cfs: cada tag se clasifica (en caché) en los campos
+        # que alimenta; los de valor único dejan de buscarse tras la primera
+        # coincidencia y los DocumentReference se procesan todos
         estado = ""
-        for elem in cfs.iter():
-            if 'ContractFolderStatusCode' in elem.tag:
-                estado = elem.text or ""
-                break
-        
-        # Solo ADJUDICADA o RESUELTA
-        if estado not in ["ADJ", "RES", "ADJUDICADA", "RESUELTA"]:
-            return None
-        
-        # Extraer expediente
         expediente = ""
-        for elem in cfs.iter():
-            if 'ContractFolderID' in elem.tag:
-                expediente = elem.text or ""
-                break
-        
-        # Extraer CPV
         cpv = ""
-        for elem in cfs.iter():
-            if 'ItemClassificationCode' in elem.tag:
-                cpv = elem.text or ""
-                break
-        
-        # Extraer adjudicatario
         adjudicatario = "No especificado"
         nif = None
         es_pyme = False
+        importe = 0.0
+        fecha = ""
+        organo = ""
+        duracion_dias = None
+        pliegos = PliegoInfo()
         
+        pendientes = _CAMPOS_ENTRY
         for elem in cfs.iter():
-            if 'WinningParty' in elem.tag:
+            campos = _campos_tag(elem.tag) & pendientes
+            if not campos:
+                continue
+            
+            if campos & _CAMPO_ESTADO:
+                estado = elem.text or ""
+                # Solo ADJUDICADA o RESUELTA
+                if estado not in ESTADOS_ADJUDICADOS:
+                    return None
+                pendientes &= ~_CAMPO_ESTADO
+            
+            if campos & _CAMPO_EXPEDIENTE:
+                expediente = elem.text or ""
+                pendientes &= ~_CAMPO_EXPEDIENTE
+            
+            if campos & _CAMPO_CPV:
+                cpv = elem.text or ""
+                pendientes &= ~_CAMPO_CPV
+            
+            # Adjudicatario: solo el primer WinningParty
+            if campos & _CAMPO_ADJUDICATARIO:
                 for sub in elem.iter():
                     if sub.tag.endswith('Name') and sub.text:
                         adjudicatario = sub.text.strip()
@@ -1153,39 +1481,30 @@ def parse_entry(entry: ET.Element) -> Optional[Adjudicacion]:
                         nif = sub.text
                     if 'SMEAwardedIndicator' in sub.tag:
                         es_pyme = sub.text == "true"
-                break
-        
-        # Extraer importe
-        importe = 0.0
-        for elem in cfs.iter():
-            if 'TotalAmount' in elem.tag or 'TaxExclusiveAmount' in elem.tag:
+                pendientes &= ~_CAMPO_ADJUDICATARIO
+            
+            if campos & _CAMPO_IMPORTE:
                 try:
                     importe = float(elem.text)
-                except:
+                except (ValueError, TypeError):
                     pass
-                break
-        
-        # Extraer fecha adjudicación
-        fecha = ""
-        for elem in cfs.iter():
-            if 'AwardDate' in elem.tag and elem.text:
+                pendientes &= ~_CAMPO_IMPORTE
+            
+            # Fecha adjudicación: la primera con texto
+            if campos & _CAMPO_FECHA and elem.text:
                 fecha = elem.text
-                break
-        
-        # Extraer órgano
-        organo = ""
-        for elem in cfs.iter():
-            if 'LocatedContractingParty' in elem.tag:
+                pendientes &= ~_CAMPO_FECHA
+            
+            # Órgano: primer Name del primer LocatedContractingParty
+            if campos & _CAMPO_ORGANO:
                 for sub in elem.iter():
                     if sub.tag.endswith('Name') and sub.text:
                         organo = sub.text.strip()
                         break
-                break
-        
-        # Extraer duración
-        duracion_dias = None
-        for elem in cfs.iter():
-            if 'DurationMeasure' in elem.tag and elem.text:
+                pendientes &= ~_CAMPO_ORGANO
+            
+            # Duración: la primera con texto
+            if campos & _CAMPO_DURACION and elem.text:
                 try:
                     duracion_dias = int(float(elem.text))
                     # Comprobar unidad
@@ -1194,14 +1513,12 @@ def parse_entry(entry: ET.Element) -> Optional[Adjudicacion]:
                         duracion_dias *= 30
                     elif unit == 'ANN':
                         duracion_dias *= 365
-                except:
+                except (ValueError, OverflowError):
                     pass
-                break
-        
-        # Extraer URLs de pliegos
-        pliegos = PliegoInfo()
-        for elem in cfs.iter():
-            if 'DocumentReference' in elem.tag:
+                pendientes &= ~_CAMPO_DURACION
+            
+            # URLs de pliegos: todos los DocumentReference
+            if campos & _CAMPO_DOCUMENTO:
                 doc_url = ""
                 doc_type = ""
                 for sub in elem.iter():
@@ -1218,8 +1535,14 @@ def parse_entry(entry: ET.Element) -> Optional[Adjudicacion]:
                     else:
                         pliegos.url_otros_documentos.append(doc_url)
         
+        # Entry sin código de estado
+        if estado not in ESTADOS_ADJUDICADOS:
+            return None
+        
         # Clasificar y analizar
-        keywords = extraer_keywords(objeto)
+        objeto_lower = objeto.lower()
+        filas_keywords = _filas_keywords(objeto_lower)
+        keywords = _keywords_de_filas(filas_keywords)
         tipo_match, cpv_desc = clasificar_cpv(cpv)
         
         # Si es CPV de obra, necesita keywords para ser relevante
@@ -1243,7 +1566,10 @@ def parse_entry(entry: ET.Element) -> Optional[Adjudicacion]:
             tipo_match = "CPV_AUDIOVISUAL_CON_CABLEADO"
         
         # Calcular dolor
-        dolor = calcular_dolor(objeto, fecha, duracion_dias, cpv, keywords)
+        dolor = calcular_dolor(
+            objeto, fecha, duracion_dias, cpv, keywords, objeto_lower, ahora,
+            peso_keywords=_peso_keywords(objeto_lower)
+        )
         
         return Adjudicacion(
             expediente=expediente,
@@ -1257,7 +1583,7 @@ def parse_entry(entry: ET.Element) -> Optional[Adjudicacion]:
             cpv_descripcion=cpv_desc,
             url=url,
             tipo_match=tipo_match,
-            keywords_encontradas=keywords,
+            filas_keywords=filas_keywords,
             es_pyme=es_pyme,
             dolor=dolor,
             pliegos=pliegos,
@@ -1268,24 +1594,68 @@ def parse_entry(entry: ET.Element) -> Optional[Adjudicacion]:
         return None
 
 
-def procesar_feed(xml_content: str) -> List[Adjudicacion]:
-    """Procesa feed completo"""
+# Tamaño de los trozos con que se alimenta el parser incremental del feed
+FEED_CHUNK = 1 << 20
+
+
+def _trozos_feed(xml_content):
+    """Trozos a alimentar al parser: str/bytes se cortan en FEED_CHUNK, un iterable se usa tal cual"""
+    if isinstance(xml_content, (str, bytes, bytearray)):
+        for i in range(0, len(xml_content), FEED_CHUNK):
+            yield xml_content[i:i + FEED_CHUNK]
+    else:
+        yield from xml_content
+
+
+def procesar_feed(xml_content) -> List[Adjudicacion]:
+    """
+    Procesa feed completo (str, bytes o iterable de trozos, p.ej. la descarga en streaming).
+
+    Parseo incremental: cada <entry> se procesa al cerrarse y se libera a
+    continuación, así el árbol en memoria no crece con el tamaño del feed.
+    Con un iterable de trozos de red, el parseo avanza mientras llega la descarga.
+    """
     adjudicaciones = []
-    
-    try:
-        root = ET.fromstring(xml_content)
-        entries = root.findall('.//{http://www.w3.org/2005/Atom}entry')
-        
-        print(f"📡 Procesando {len(entries)} entries...")
-        
-        for entry in entries:
-            adj = parse_entry(entry)
+    procesadas = 0
+    parser = ET.XMLPullParser(events=("start", "end"))
+    root = None
+    # Mismo "ahora" para todas las entries del feed
+    ahora = datetime.now()
+
+    def consumir_eventos():
+        nonlocal root, procesadas
+        for evento, elem in parser.read_events():
+            if evento == "start":
+                if root is None:
+                    root = elem
+                continue
+            if elem.tag != _ATOM_ENTRY:
+                continue
+
+            procesadas += 1
+            adj = parse_entry(elem, ahora)
             if adj:
                 adjudicaciones.append(adj)
-        
+
+            # Liberar el entry ya procesado (contenido y referencia desde <feed>)
+            elem.clear()
+            try:
+                root.remove(elem)
+            except ValueError:
+                pass  # entry no colgado directamente de la raíz: basta con clear()
+
+    try:
+        for trozo in _trozos_feed(xml_content):
+            parser.feed(trozo)
+            consumir_eventos()
+        parser.close()
+        consumir_eventos()
+
     except ET.ParseError as e:
         print(f"❌ Error XML: {e}")
-    
+
+    print(f"📡 Procesadas {procesadas} entries...")
+
     return adjudicaciones
 
 
@@ -1293,14 +1663,20 @@ def procesar_feed(xml_content: str) -> List[Adjudicacion]:
 # GENERACIÓN DE REPORTES
 # ============================================================================
 
+# Bordes de la caja de cada oportunidad en el reporte (fijos: se construyen una vez)
+_CAJA_SUPERIOR = f"┌{'─' * 68}┐"
+_CAJA_SEPARADOR = f"├{'─' * 68}┤"
+_CAJA_INFERIOR = f"└{'─' * 68}┘"
+
 def generar_reporte_dolor(adjudicaciones: List[Adjudicacion]) -> str:
     """Genera reporte priorizado por nivel de dolor"""
     
     if not adjudicaciones:
         return "No se encontraron oportunidades."
     
-    # Ordenar por score total (mayor dolor primero)
-    adjudicaciones.sort(key=lambda x: x.score_total(), reverse=True)
+    # Ordenar por score total (mayor dolor primero); score_total queda memoizado
+    # en cada adjudicación, el detalle lo reutiliza
+    adjudicaciones.sort(key=Adjudicacion.score_total, reverse=True)
     
     lineas = [
         "",
@@ -1312,31 +1688,39 @@ def generar_reporte_dolor(adjudicaciones: List[Adjudicacion]) -> str:
         "",
     ]
     
-    # Resumen por nivel de dolor
+    # Resumen por nivel de dolor e importe total (una sola pasada)
     por_nivel = {}
+    total = 0
     for adj in adjudicaciones:
-        nivel = adj.dolor.nivel.value
+        nivel = adj.dolor.nivel.etiqueta
         por_nivel[nivel] = por_nivel.get(nivel, 0) + 1
+        total += adj.importe
     
     lineas.append("   DISTRIBUCIÓN POR URGENCIA:")
     for nivel, count in sorted(por_nivel.items(), key=lambda x: x[0]):
         lineas.append(f"   {nivel}: {count}")
     
     # Importe total
-    total = sum(adj.importe for adj in adjudicaciones)
     lineas.append(f"\n   💰 VALOR TOTAL EN CONTRATOS: {total:,.0f} EUR")
     lineas.append("")
     lineas.append("=" * 70)
     
-    # Detalle de cada oportunidad
+    # Detalle de cada oportunidad (recogiendo de paso las críticas y altas, en orden)
+    criticos = []
+    altos = []
     for i, adj in enumerate(adjudicaciones, 1):
         score = adj.score_total()
+        nivel = adj.dolor.nivel
+        if nivel == NivelDolor.CRITICO:
+            criticos.append(adj)
+        elif nivel == NivelDolor.ALTO:
+            altos.append(adj)
         
         lineas.extend([
             "",
-            f"┌{'─' * 68}┐",
-            f"│ [{i}] SCORE: {score}/100  {adj.dolor.nivel.value}",
-            f"├{'─' * 68}┤",
+            _CAJA_SUPERIOR,
+            f"│ [{i}] SCORE: {score}/100  {nivel.etiqueta}",
+            _CAJA_SEPARADOR,
             f"│ 📋 {adj.objeto[:64]}",
         ])
         
@@ -1365,11 +1749,11 @@ def generar_reporte_dolor(adjudicaciones: List[Adjudicacion]) -> str:
             f"│ 🎯 TIPO: {adj.dolor.tipo_oportunidad.value}",
         ])
         
-        # Keywords detectadas
-        if adj.keywords_encontradas:
-            kws = ", ".join([f"{k}({v})" for k, v in 
-                           sorted(adj.keywords_encontradas.items(), 
-                                  key=lambda x: x[1], reverse=True)[:5]])
+        # Keywords detectadas (las 5 de más peso: selección parcial, sin ordenar todas)
+        keywords = adj.keywords_encontradas
+        if keywords:
+            kws = ", ".join([f"{k}({v})" for k, v in
+                             heapq.nlargest(5, keywords.items(), key=itemgetter(1))])
             lineas.append(f"│ 🔍 KEYWORDS: {kws}")
         
         # Indicadores de dolor
@@ -1388,12 +1772,9 @@ def generar_reporte_dolor(adjudicaciones: List[Adjudicacion]) -> str:
         if adj.pliegos.url_pliego_administrativo:
             lineas.append(f"│    Pliego Admin: {adj.pliegos.url_pliego_administrativo}")
         
-        lineas.append(f"└{'─' * 68}┘")
+        lineas.append(_CAJA_INFERIOR)
     
     # Recomendaciones de acción
-    criticos = [a for a in adjudicaciones if a.dolor.nivel == NivelDolor.CRITICO]
-    altos = [a for a in adjudicaciones if a.dolor.nivel == NivelDolor.ALTO]
-    
     if criticos or altos:
         lineas.extend([
             "",
@@ -1449,7 +1830,7 @@ TIPO DE OPORTUNIDAD
 ═══════════════════
 {adj.dolor.tipo_oportunidad.value}
 
-NIVEL DE URGENCIA: {adj.dolor.nivel.value}
+NIVEL DE URGENCIA: {adj.dolor.nivel.etiqueta}
 {chr(10).join(['⚠️ ' + i for i in adj.dolor.indicadores_urgencia]) if adj.dolor.indicadores_urgencia else ""}
 
 DOCUMENTACIÓN PARA ESTUDIAR
@@ -1478,16 +1859,27 @@ en la ejecución?"
 """
 
 
-def generar_json_crm(adjudicaciones: List[Adjudicacion]) -> str:
-    """Genera JSON para importar en CRM"""
+def generar_dict_crm(adjudicaciones: List[Adjudicacion]) -> Dict:
+    """Genera la estructura para importar en CRM (sin serializar)"""
     
-    data = {
+    # Totales de la cabecera en una sola pasada
+    importe_total = 0
+    criticos = 0
+    altos = 0
+    for a in adjudicaciones:
+        importe_total += a.importe
+        if a.dolor.nivel == NivelDolor.CRITICO:
+            criticos += 1
+        elif a.dolor.nivel == NivelDolor.ALTO:
+            altos += 1
+    
+    return {
         "meta": {
             "generado": datetime.now().isoformat(),
             "total": len(adjudicaciones),
-            "importe_total": sum(a.importe for a in adjudicaciones),
-            "criticos": len([a for a in adjudicaciones if a.dolor.nivel == NivelDolor.CRITICO]),
-            "altos": len([a for a in adjudicaciones if a.dolor.nivel == NivelDolor.ALTO]),
+            "importe_total": importe_total,
+            "criticos": criticos,
+            "altos": altos,
         },
         "oportunidades": [
             {
@@ -1516,15 +1908,28 @@ def generar_json_crm(adjudicaciones: List[Adjudicacion]) -> str:
                     "url_pliego_admin": a.pliegos.url_pliego_administrativo,
                 },
                 "accion": {
-                    "prioridad": "URGENTE" if a.dolor.nivel in [NivelDolor.CRITICO, NivelDolor.ALTO] else "NORMAL",
+                    "prioridad": "URGENTE" if a.dolor.nivel in NIVELES_URGENTES else "NORMAL",
                     "siguiente_paso": "Contactar" if a.dolor.nivel == NivelDolor.CRITICO else "Estudiar pliego",
                 }
             }
             for a in adjudicaciones
         ]
     }
-    
-    return json.dumps(data, indent=2, ensure_ascii=False, default=str)
+
+
+def _json_crm(adjudicaciones: List[Adjudicacion]) -> bytes:
+    """JSON del CRM en UTF-8 (orjson serializa en C directamente a bytes)"""
+    return orjson.dumps(generar_dict_crm(adjudicaciones), option=orjson.OPT_INDENT_2, default=str)
+
+
+def generar_json_crm(adjudicaciones: List[Adjudicacion]) -> str:
+    """Genera JSON para importar en CRM"""
+    return _json_crm(adjudicaciones).decode()
+
+
+def escribir_json_crm(adjudicaciones: List[Adjudicacion], fp: BinaryIO):
+    """Escribe el JSON del CRM en un fichero abierto en binario, sin pasar por str"""
+    fp.write(_json_crm(adjudicaciones))
 
 
 # ============================================================================
@@ -1791,6 +2196,12 @@ def generar_feed_ejemplo() -> str:
 # MAIN
 # ============================================================================
 
+def _escribir_texto(ruta: str, texto: str):
+    """Escribe un fichero de texto UTF-8 (para el pool de escritura de main)"""
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write(texto)
+
+
 def main():
     print("""
     ███████╗██████╗  ██████╗ ████████╗████████╗███████╗██████╗ 
@@ -1823,17 +2234,18 @@ def main():
     os.makedirs("/home/claude/placsp_detector/output", exist_ok=True)
     
     # JSON para CRM
-    json_crm = generar_json_crm(adjudicaciones)
-    with open("/home/claude/placsp_detector/output/oportunidades_crm.json", "w", encoding="utf-8") as f:
-        f.write(json_crm)
+    with open("/home/claude/placsp_detector/output/oportunidades_crm.json", "wb") as f:
+        escribir_json_crm(adjudicaciones, f)
     
-    # Fichas comerciales individuales
+    # Fichas comerciales individuales: se generan en orden (un expediente repetido
+    # se queda con la última, como antes) y se escriben en paralelo
+    fichas = {}
     for adj in adjudicaciones:
-        if adj.dolor.nivel in [NivelDolor.CRITICO, NivelDolor.ALTO]:
-            ficha = generar_ficha_comercial(adj)
+        if adj.dolor.nivel in NIVELES_URGENTES:
             filename = f"/home/claude/placsp_detector/output/ficha_{adj.expediente.replace('/', '_')}.txt"
-            with open(filename, "w", encoding="utf-8") as f:
-                f.write(ficha)
+            fichas[filename] = generar_ficha_comercial(adj)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(_escribir_texto, fichas.keys(), fichas.values()))
     
     # Reporte completo
     with open("/home/claude/placsp_detector/output/reporte_dolor.txt", "w", encoding="utf-8") as f:
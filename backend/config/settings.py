@@ -1,3 +1,4 @@
+from functools import lru_cache
 from pydantic_settings import BaseSettings
 from typing import Optional, List
 
@@ -24,5 +25,13 @@ class Settings(BaseSettings):
     class Config:
         env_file = ".env"
         extra = "ignore"
+        frozen = True
 
-settings = Settings()
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Settings leídos (entorno + .env) y validados una sola vez, al primer uso.
+    Usable como dependencia de FastAPI: Depends(get_settings)
+    """
+    return Settings()
@@ -3128,3 +3128,5 @@ logger = logging.getLogger(__name__)
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
+    from app.spotter.pliego_analyzer import cerrar_pliego_analyzer
+    await cerrar_pliego_analyzer()
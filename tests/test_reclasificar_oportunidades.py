@@ -0,0 +1,71 @@
+"""
+Tests de la reclasificación por lotes (app/spotter/reclasificar_oportunidades.py)
+Deduplicación de entradas repetidas y documentos con campos no hashables
+"""
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.spotter import reclasificar_oportunidades as rec
+
+OBJETO = "Servicio de soporte técnico helpdesk y mantenimiento del CPD municipal"
+
+
+def _opp(n, cpv="72500000", fecha="2026-01-05"):
+    return {
+        "_id": n,
+        "oportunidad_id": f"OPP-{n}",
+        "expediente": f"EXP-{n}",
+        "objeto": OBJETO,
+        "cpv": cpv,
+        "fecha_adjudicacion": fecha,
+        "dias_restantes": 180,
+        "tipo_srs": "",
+        "score": 0,
+    }
+
+
+class TestDeduplicar:
+    """Agrupación de entradas antes de enviarlas al pool"""
+
+    def test_repetidas_se_analizan_una_vez(self):
+        a = (OBJETO, "72500000", "2026-01-05", 180)
+        b = (OBJETO, "45210000", "2026-01-05", 180)
+        unicas, posiciones = rec._deduplicar([a, b, a])
+
+        assert unicas == [a, b]
+        assert posiciones == [0, 1, 0]
+
+    def test_no_hashables_van_solas(self):
+        a = (OBJETO, "72500000", "2026-01-05", 180)
+        lista = (OBJETO, ["72500000", "72600000"], "2026-01-05", 180)
+        dicc = (OBJETO, "72500000", {"$date": "2026-01-05"}, 180)
+        unicas, posiciones = rec._deduplicar([a, lista, a, dicc, lista])
+
+        assert unicas == [a, lista, dicc, lista]
+        assert posiciones == [0, 1, 0, 2, 3]
+
+
+def test_procesar_lote_con_repetidas_y_no_hashables():
+    """Un documento con cpv en lista no aborta el lote: como mucho cuenta como error"""
+    pytest.importorskip("pymongo")
+    lote = [_opp(1), _opp(2), _opp(3, cpv=["72500000"]), _opp(4, fecha={"$date": "2026-01-05"})]
+    cambios = []
+
+    async def _ejecutar():
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            return await rec._procesar_lote(None, pool, lote, cambios, dry_run=True)
+
+    sin_cambios, errores = asyncio.run(_ejecutar())
+
+    assert sin_cambios + errores + len(cambios) == len(lote)
+    ids = [c["oportunidad_id"] for c in cambios]
+    assert "OPP-1" in ids and "OPP-2" in ids
+    por_id = {c["oportunidad_id"]: c for c in cambios}
+    assert por_id["OPP-1"]["tipo_nuevo"] == por_id["OPP-2"]["tipo_nuevo"]
@@ -0,0 +1,163 @@
+"""
+Tests de regresión para SpotterSRS (app/spotter/spotter_srs.py)
+Fija keywords, tipo de oportunidad y score de entries Atom de PLACSP, con el
+autómata Aho-Corasick y con el camino sin pyahocorasick (regex + subcadenas)
+"""
+import os
+import sys
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.spotter import spotter_srs as srs
+from app.spotter.spotter_srs import NivelDolor, TipoOportunidad
+
+# Instante de referencia para los plazos (los scores dependen de los días restantes)
+AHORA = datetime(2026, 3, 1, 12, 0)
+
+ENTRY_TPL = '''<entry xmlns="http://www.w3.org/2005/Atom">
+  <title>{titulo}</title>
+  <link href="https://contrataciondelestado.es/wps/poc?uri=deeplink&amp;idEvl={expediente}"/>
+  <content type="application/xml">
+    <cfs:ContractFolderStatus xmlns:cfs="urn:dgpe:names:draft:codice:schema:xsd:ContractFolderStatus-2"
+        xmlns:cbc="urn:dgpe:names:draft:codice:schema:xsd:CommonBasicComponents-2"
+        xmlns:cac="urn:dgpe:names:draft:codice:schema:xsd:CommonAggregateComponents-2">
+      <cbc:ContractFolderID>{expediente}</cbc:ContractFolderID>
+      <cbc:ContractFolderStatusCode>{estado}</cbc:ContractFolderStatusCode>
+      <cac:ProcurementProject>
+        <cac:PlannedPeriod><cbc:DurationMeasure unitCode="MON">{meses}</cbc:DurationMeasure></cac:PlannedPeriod>
+        <cac:RequiredCommodityClassification><cbc:ItemClassificationCode>{cpv}</cbc:ItemClassificationCode></cac:RequiredCommodityClassification>
+      </cac:ProcurementProject>
+      <cac:LocatedContractingParty><cac:Party><cac:PartyName><cbc:Name>Ayuntamiento de Prueba</cbc:Name></cac:PartyName></cac:Party></cac:LocatedContractingParty>
+      <cac:TenderResult>
+        <cbc:AwardDate>2026-01-05</cbc:AwardDate>
+        <cac:WinningParty>
+          <cac:PartyName><cbc:Name>Empresa Adjudicataria SL</cbc:Name></cac:PartyName>
+          <cac:PartyIdentification><cbc:ID>B12345678</cbc:ID></cac:PartyIdentification>
+          <cbc:SMEAwardedIndicator>{pyme}</cbc:SMEAwardedIndicator>
+        </cac:WinningParty>
+        <cac:AwardedTenderedProject><cbc:TotalAmount currencyID="EUR">{importe}</cbc:TotalAmount></cac:AwardedTenderedProject>
+      </cac:TenderResult>
+    </cfs:ContractFolderStatus>
+  </content>
+</entry>'''
+
+
+def _entry(titulo, expediente, cpv, importe, pyme="false", estado="ADJ", meses=12) -> ET.Element:
+    return ET.fromstring(ENTRY_TPL.format(
+        titulo=titulo, expediente=expediente, estado=estado, meses=meses,
+        cpv=cpv, pyme=pyme, importe=importe,
+    ))
+
+
+@pytest.fixture(params=["ahocorasick", "sin_ahocorasick"], autouse=True)
+def motor_keywords(request, monkeypatch):
+    """Ejecuta cada test con el autómata y con el camino de respaldo sin pyahocorasick"""
+    if request.param == "ahocorasick":
+        if srs._AC_KEYWORDS is None:
+            pytest.skip("pyahocorasick no instalado")
+    else:
+        monkeypatch.setattr(srs, "_AC_KEYWORDS", None)
+        monkeypatch.setattr(srs, "_AC_URGENCIA", None)
+    # El escaneo está memoizado: sin limpiar, un modo vería los resultados del otro
+    srs._escanear.cache_clear()
+    yield request.param
+    srs._escanear.cache_clear()
+
+
+class TestParseEntry:
+    """Entries completas: keywords, tipo de oportunidad y score"""
+
+    def test_soporte_it_pyme_urgente(self):
+        adj = srs.parse_entry(_entry(
+            "Servicio de soporte técnico helpdesk urgente y mantenimiento del CPD municipal",
+            "T-1", cpv="72500000", importe="85000.00", pyme="true", meses=6,
+        ), AHORA)
+
+        assert adj is not None
+        assert adj.keywords_encontradas == {"soporte técnico": 10, "helpdesk": 10, "cpd": 9}
+        assert adj.dolor.tipo_oportunidad == TipoOportunidad.SOPORTE_IT_HELPDESK
+        assert adj.dolor.nivel == NivelDolor.BAJO
+        assert adj.dolor.dias_hasta_fin == 124
+        assert "Urgencia detectada: 'urgente'" in adj.dolor.indicadores_urgencia
+        assert adj.es_pyme and adj.nif_adjudicatario == "B12345678"
+        assert adj.score_total() == 64
+
+    def test_obra_con_cableado(self):
+        adj = srs.parse_entry(_entry(
+            "Obras de nuevo edificio con cableado estructurado Cat6A y fibra óptica",
+            "T-2", cpv="45210000", importe="2450000.00", meses=18,
+        ), AHORA)
+
+        assert adj is not None
+        assert adj.tipo_match == "CPV_OBRA_EMBEBIDO"
+        assert adj.keywords_encontradas == {
+            "cableado estructurado": 10, "cableado": 7, "cat6": 10, "cat6a": 10, "fibra óptica": 10,
+        }
+        assert adj.dolor.tipo_oportunidad == TipoOportunidad.SUBCONTRATACION_CABLEADO
+        assert adj.score_total() == 60
+
+    def test_fotovoltaica_resuelta(self):
+        adj = srs.parse_entry(_entry(
+            "Instalación de planta fotovoltaica en cubierta de polideportivo",
+            "T-3", cpv="09331200", importe="150000", pyme="true", estado="RES", meses=4,
+        ), AHORA)
+
+        assert adj is not None
+        assert adj.keywords_encontradas == {"fotovoltaica": 10, "planta fotovoltaica": 9}
+        assert adj.dolor.tipo_oportunidad == TipoOportunidad.FOTOVOLTAICA_ENERGIA
+        assert adj.dolor.nivel == NivelDolor.MEDIO
+        assert adj.score_total() == 51
+
+    def test_keyword_palabra_completa(self):
+        # "ens" solo cuenta como palabra completa: "Ensayos" no la activa
+        adj = srs.parse_entry(_entry(
+            "Ensayos de laboratorio y adecuación al ENS de la sede",
+            "T-6", cpv="71600000", importe="60000",
+        ), AHORA)
+
+        assert adj is not None
+        assert adj.keywords_encontradas == {"ens": 10}
+        assert adj.dolor.tipo_oportunidad == TipoOportunidad.CIBERSEGURIDAD_ENS
+        assert adj.score_total() == 13
+
+    def test_sin_keywords_ni_cpv_relevante(self):
+        adj = srs.parse_entry(_entry(
+            "Suministro de material de oficina", "T-4", cpv="30192000", importe="12000",
+        ), AHORA)
+        assert adj is None
+
+    def test_estado_no_adjudicado(self):
+        adj = srs.parse_entry(_entry(
+            "Servicio de soporte técnico helpdesk", "T-5", cpv="72500000", importe="85000",
+            estado="PUB",
+        ), AHORA)
+        assert adj is None
+
+
+class TestExtraerKeywords:
+    """Extracción de keywords sobre el texto del objeto"""
+
+    def test_palabra_completa_no_casa_dentro_de_otra(self):
+        assert srs.extraer_keywords("Ensayos de resistencia de materiales") == {}
+
+    def test_mayusculas(self):
+        assert srs.extraer_keywords("MIGRACIÓN A CLOUD Y BACKUP") == {"cloud": 7, "backup": 8}
+
+
+def test_feed_de_ejemplo():
+    """El feed de ejemplo completo se procesa igual con y sin pyahocorasick"""
+    adjudicaciones = srs.procesar_feed(srs.generar_feed_ejemplo())
+    tipos = {a.expediente: a.dolor.tipo_oportunidad for a in adjudicaciones}
+
+    assert tipos == {
+        "2025/OBR/1847": TipoOportunidad.SUBCONTRATACION_CABLEADO,
+        "2026/DIGIT/0015": TipoOportunidad.CLOUD_VIRTUALIZACION,
+        "2026/INF/0089": TipoOportunidad.SUBCONTRATACION_CABLEADO,
+        "2026/SERV/0042": TipoOportunidad.SOPORTE_IT_HELPDESK,
+        "ECON/000161/2022": TipoOportunidad.CONSULTORIA_TECNICA,
+    }